@@ -1,43 +1,296 @@
-from itertools import permutations
-import re
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from bdd import BDD
+from expression import (COLUMN_CACHE_BYTES, ExpressionDag, compile_expression, compile_outputs,
+                        fictitious_positions, parse_expression, substitute_variables, variable_masks)
+from minimizer import minimize, format_dnf
+from sat import CDCLSolver, expression_cnf
+from tables import (BitTable, BddTable, ColumnTable, MappedTable, MultiTable, assignment_columns, column_mask,
+                    decode_row, iter_set_bits, load_packed, save_packed)
+
+# Допустимое число переменных в задаче ЕГЭ на восстановление столбцов
+MIN_EGE_VARS = 3
+MAX_EGE_VARS = 8
+
+# Параллельный режим: минимальный размер куска (в переменных) и число кусков на процесс
+PARALLEL_MIN_SLICE_VARS = 12
+PARALLEL_SLICES_PER_WORKER = 4
+
+# Расчёт с индикатором прогресса делится на 2^k кусков по старшим переменным
+PROGRESS_SPLIT_VARS = 6
+
+# До этого числа переменных фиктивные ищутся по маске таблицы, дальше — по диаграмме решений
+FICTITIOUS_BITS_MAX_VARS = 24
+
+# Граф подвыражений recalculate пересобирается из одного текущего выражения,
+# когда в нём накопилось больше узлов (иначе он растёт с каждой правкой)
+DAG_MAX_NODES = 4096
+
+
+def _evaluate_slice(expression, prefix, low_vars):
+    """Кусок таблицы для процесса-исполнителя: упакованные байты, без построчной передачи."""
+    mask = compile_expression(expression).evaluate_block(prefix, low_vars)
+    return mask.to_bytes((1 << low_vars) // 8, 'little')
 
 
 class TruthTableCalculator:
     def __init__(self):
         self.results = []
         self.expression = ""
+        # Выражение, по которому построена таблица: без фиктивных переменных
+        # после calculate(..., essential_only=True), иначе совпадает с self.expression
+        self.table_expression = ""
         self.variables = []
+        # Упакованная таблица (режим 'bits'); None, если результаты хранятся списком
+        self.table = None
+        # Фиктивные переменные, выброшенные при calculate(..., essential_only=True)
+        self.fictitious = []
+        # Нарастающие итоги потокового обхода iter_rows (для get_stats без полной таблицы)
+        self.stream_stats = None
+        # Граф подвыражений calculate(mode='bits') и recalculate, маски его узлов: (порядок столбцов, {узел: маска})
+        self._dag = ExpressionDag()
+        self._node_masks = ((), {})
+        # Сколько узлов последний расчёт по графу калькулятора взял из кэша и сколько посчитал заново
+        self.incremental_stats = None
+
+    def calculate(self, expression, mode='compiled', workers=None, essential_only=False,
+                  progress_cb=None, cancel_cb=None):
+        """
+        Вычисляет таблицу истинности для выражения.
+        mode='compiled' — построчный расчёт, результаты списком словарей;
+        mode='bits' — вся таблица одним побитовым вычислением над масками 2^n бит,
+        строки восстанавливаются лениво (годится для 20-24 переменных);
+        mode='numpy' — вычисление над столбцами NumPy, результаты хранятся по столбцам;
+        mode='bdd' — диаграмма решений вместо таблицы: статистика и фильтры
+        работают и для 40-60 переменных, строки перечисляются лениво;
+        mode='gray' — пошаговый обход в порядке кода Грея с пересчётом только
+        изменившихся подвыражений (чистый Python, результат — как у 'bits');
+        mode='parallel' — как 'bits', но таблица делится по старшим переменным
+        на куски, которые считаются в workers процессах (по умолчанию — все ядра).
+
+        essential_only=True — фиктивные переменные (не влияющие на результат)
+        заменяются константой, и таблица строится только по существенным;
+        выброшенные переменные сохраняются в self.fictitious, выражение без них —
+        в self.table_expression, а self.expression остаётся таким, как его ввели.
+
+        progress_cb(готово_строк, всего_строк, маска_готовой_части) и cancel_cb() -> bool
+        (только для mode='bits') позволяют считать таблицу в фоновом потоке:
+        она вычисляется кусками, а при отмене бросается RuntimeError и прежние
+        результаты калькулятора остаются нетронутыми. Для recalculate в этом случае
+        запоминается только маска всей таблицы, без масок промежуточных узлов.
+
+        Вместо одного выражения можно передать список: все выражения считаются
+        за один проход по общему набору переменных (см. _calculate_many).
+        """
+        if isinstance(expression, (list, tuple)):
+            return self._calculate_many(expression, mode)
 
-    def calculate(self, expression):
-        """Вычисляет таблицу истинности для выражения."""
-        self.expression = expression
-        self.variables = self._extract_variables(expression)
-        if not self.variables:
+        source = expression
+        compiled = compile_expression(expression)
+        fictitious = []
+        if essential_only:
+            fictitious = self.find_fictitious_variables(expression)
+            if len(fictitious) == len(compiled.variables):
+                fictitious = fictitious[1:]  # константа: оставляем одну переменную для таблицы
+            if fictitious:
+                expression = substitute_variables(expression, dict.fromkeys(fictitious, 0))
+                compiled = compile_expression(expression)
+
+        if not compiled.variables:
             raise Exception("Не удалось найти переменные в выражении.")
 
-        self.results = []
-        num_vars = len(self.variables)
+        mask = None
+        if mode == 'bits':
+            compute = None
+            if progress_cb or cancel_cb:
+                compute = lambda: self._evaluate_with_progress(compiled, progress_cb, cancel_cb)
+            # Маски узлов остаются в кэше калькулятора для последующих recalculate
+            mask = self._evaluate_nodes(compiled.tree, compiled.variables, compute)
+
+        self.expression = source
+        self.table_expression = expression
+        self.fictitious = fictitious
+        self.variables = compiled.variables
 
-        for i in range(2 ** num_vars):
-            values = {}
-            temp_i = i
-            # Присваиваем значения переменным в обратном порядке для стандартного вида таблицы
-            for var in reversed(self.variables):
-                values[var] = temp_i % 2
-                temp_i //= 2
-
-            try:
-                result = eval(self.expression, {"__builtins__": {}}, values)
-                row = values
-                row['result'] = bool(result)
-                self.results.append(row)
-            except Exception as e:
-                raise Exception(f"Ошибка вычисления для {values}: {str(e)}")
+        self.stream_stats = None
+        if mode in ('bits', 'gray', 'parallel'):
+            if mode == 'gray':
+                mask = compiled.evaluate_gray()
+            elif mode == 'parallel':
+                mask = self._evaluate_parallel(expression, len(self.variables), workers)
+            return self._set_table(BitTable(self.variables, mask))
+        if mode == 'bdd':
+            bdd = BDD(self.variables)
+            return self._set_table(BddTable(self.variables, bdd, bdd.build(compiled.dag, compiled.root)))
+        if mode == 'numpy':
+            matrix = assignment_columns(len(self.variables))
+            columns = [matrix[:, j] for j in range(len(self.variables))]
+            result = compiled.evaluate_columns(columns)
+            return self._set_table(ColumnTable(self.variables, dict(zip(self.variables, columns)), result))
+        if mode != 'compiled':
+            raise ValueError(f"Неизвестный режим вычисления: {mode}")
 
+        # Выражение разобрано один раз, для каждой строки вызывается готовая функция
+        results = []
+        for bits, result in compiled.iter_results():
+            row = dict(zip(self.variables, bits))
+            row['result'] = bool(result)
+            results.append(row)
+        return self._set_table(None, results)
+
+    def _set_table(self, table, results=None):
+        """
+        Делает table текущей таблицей (None — результаты списком results).
+        Прежняя таблица из файла (MappedTable) закрывается, чтобы не держать mmap и файл.
+        """
+        if isinstance(self.table, MappedTable) and self.table is not table:
+            self.table.close()
+        self.table = table
+        self.results = table if table is not None else results
         return self.results
 
+    def _calculate_many(self, expressions, mode='compiled'):
+        """
+        Таблица нескольких выражений сразу (MultiTable): переменные — объединение
+        переменных всех выражений, общие подвыражения считаются один раз.
+        Режимы 'compiled' и 'bits' считают маски, 'numpy' — столбцы NumPy.
+        self.expression и фильтры относятся к первому выражению.
+        """
+        if not expressions:
+            raise Exception("Не задано ни одного выражения.")
+        outputs = compile_outputs(tuple(expressions))
+        if not outputs.variables:
+            raise Exception("Не удалось найти переменные в выражении.")
+
+        if mode in ('compiled', 'bits'):
+            masks = outputs.evaluate_bits()
+        elif mode == 'numpy':
+            matrix = assignment_columns(len(outputs.variables))
+            columns = outputs.evaluate_columns([matrix[:, j] for j in range(len(outputs.variables))])
+            masks = [column_mask(column) for column in columns]
+        else:
+            raise ValueError(f"Для нескольких выражений доступны режимы 'compiled', 'bits' и 'numpy', получено: {mode}")
+
+        self.expression = self.table_expression = expressions[0]
+        self.variables = outputs.variables
+        self.fictitious = []
+        self.stream_stats = None
+        return self._set_table(MultiTable(self.variables, expressions, masks))
+
+    def recalculate(self, expression):
+        """
+        Инкрементальный пересчёт после правки выражения (результат — как у mode='bits').
+        Одинаковые подвыражения старого и нового выражения — это одни и те же узлы
+        графа калькулятора self._dag, поэтому их маски берутся из кэша, а считаются
+        только узлы изменённого поддерева. Кэш годится, пока не изменился набор
+        переменных; маски узлов, которых нет в новом выражении, выбрасываются.
+        """
+        tree = parse_expression(expression)
+        variables = self._dag.variables(self._dag.add(tree))
+        if not variables:
+            raise Exception("Не удалось найти переменные в выражении.")
+        mask = self._evaluate_nodes(tree, variables)
+
+        self.expression = self.table_expression = expression
+        self.variables = variables
+        self.fictitious = []
+        self.stream_stats = None
+        return self._set_table(BitTable(self.variables, mask))
+
+    def _evaluate_nodes(self, tree, variables, compute=None):
+        """
+        Маска таблицы по графу калькулятора self._dag (для mode='bits' и recalculate).
+        Маски узлов запоминаются в self._node_masks, так что следующая правка
+        выражения пересчитывает только новые узлы. compute() — другой способ получить
+        маску всей таблицы (кусками с прогрессом и отменой); тогда таблица считается
+        один раз и в кэш попадает только маска корня.
+        """
+        dag = self._dag
+        root = dag.add(tree)
+        variables = tuple(variables)
+        key, cache = self._node_masks
+        cache = dict(cache) if key == variables else {}
+
+        needed = dag.topological(root)
+        reused = sum(1 for node in needed if node in cache)
+        if compute is not None:
+            cache[root] = compute()
+        mask = dag.evaluate_bits(root, variables, cache)
+        cache = {node: cache[node] for node in needed if node in cache}
+        if len(cache) * (1 << len(variables)) // 8 > COLUMN_CACHE_BYTES:
+            cache = {root: mask}
+        if len(dag.nodes) > DAG_MAX_NODES:
+            self._dag, mapping = dag.extract(root)
+            cache = {mapping[node]: value for node, value in cache.items()}
+        self._node_masks = (variables, cache)
+        self.incremental_stats = {'reused': reused, 'computed': len(needed) - reused}
+        return mask
+
+    def find_fictitious_variables(self, expression=None):
+        """
+        Переменные, не влияющие на значение выражения (по умолчанию — текущего).
+        Кофакторы сравниваются побитово на маске таблицы, а для большого числа
+        переменных — по диаграмме решений.
+        """
+        expression = expression or self.expression
+        compiled = compile_expression(expression)
+        variables = compiled.variables
+        if len(variables) > FICTITIOUS_BITS_MAX_VARS:
+            bdd = BDD(variables)
+            support = set(bdd.support(bdd.build(compiled.dag, compiled.root)))
+            return [var for var in variables if var not in support]
+        # Таблица без фиктивных переменных (essential_only) построена не по self.expression
+        if expression == self.table_expression and type(self.table) is BitTable:
+            mask = self.table.mask
+        else:
+            mask = compiled.evaluate_bits()
+        return [variables[j] for j in fictitious_positions(mask, len(variables))]
+
+    @staticmethod
+    def _evaluate_with_progress(compiled, progress_cb=None, cancel_cb=None):
+        """Маска таблицы по кускам подряд идущих строк с отчётом о прогрессе и проверкой отмены."""
+        num_vars = len(compiled.variables)
+        high_vars = min(num_vars, PROGRESS_SPLIT_VARS)
+        low_vars = num_vars - high_vars
+        total = 1 << num_vars
+        mask = 0
+        for block in range(1 << high_vars):
+            if cancel_cb and cancel_cb():
+                raise RuntimeError("Расчёт отменён пользователем")
+            mask |= compiled.evaluate_block(block, low_vars) << (block << low_vars)
+            if progress_cb:
+                progress_cb((block + 1) << low_vars, total, mask)
+        return mask
+
+    @staticmethod
+    def _evaluate_parallel(expression, num_vars, workers=None):
+        """
+        Делит 2^n строк по значениям k старших переменных на 2^k кусков подряд идущих
+        строк и считает их в ProcessPoolExecutor. Куски приходят байтами и просто
+        склеиваются в одну маску в порядке номеров строк.
+        """
+        workers = workers or os.cpu_count() or 1
+        high_vars = max(0, (workers * PARALLEL_SLICES_PER_WORKER - 1).bit_length())
+        high_vars = min(high_vars, num_vars - PARALLEL_MIN_SLICE_VARS)
+        if workers == 1 or high_vars <= 0:
+            return compile_expression(expression).evaluate_bits()
+
+        low_vars = num_vars - high_vars
+        slices = 1 << high_vars
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            blocks = executor.map(_evaluate_slice, [expression] * slices, range(slices), [low_vars] * slices)
+            return int.from_bytes(b"".join(blocks), 'little')
+
     def get_filtered_results(self, filter_type='all'):
         """Возвращает отфильтрованные результаты"""
+        if self.table is not None:
+            return self.table.filtered(filter_type)
         if filter_type == 'all':
             return self.results
         elif filter_type == 'true':
@@ -55,124 +308,359 @@ class TruthTableCalculator:
                 return self.results
         return self.results
 
+    def iter_rows(self, expression, chunk_size=4096, filter_type='all'):
+        """
+        Потоковый обход таблицы истинности без хранения всех строк.
+        Строки считаются блоками по chunk_size (округляется до степени двойки)
+        побитовым вычислением, фильтр применяется внутри блока, наружу выдаются
+        списки строк-словарей. Итоги по уже обработанным строкам копятся в
+        self.stream_stats, так что get_stats работает и во время обхода
+        (если полная таблица не была вычислена через calculate).
+        Сохранённые результаты calculate обход не затрагивает.
+        """
+        compiled = compile_expression(expression)
+        variables = compiled.variables
+        if not variables:
+            raise Exception("Не удалось найти переменные в выражении.")
+
+        num_vars = len(variables)
+        low_vars = min(num_vars, max(chunk_size, 1).bit_length() - 1)
+        block_size = 1 << low_vars
+        blocks = 1 << (num_vars - low_vars)
+
+        if filter_type == 'minority':
+            # Меньшинство известно только после подсчёта, поэтому сначала считаем без строк
+            true_count = sum(bin(compiled.evaluate_block(b, low_vars)).count('1') for b in range(blocks))
+            false_count = (1 << num_vars) - true_count
+            filter_type = 'true' if true_count < false_count else 'false' if false_count < true_count else 'all'
+
+        self.stream_stats = {'total': 0, 'true': 0}
+
+        for block in range(blocks):
+            mask = compiled.evaluate_block(block, low_vars)
+            self.stream_stats['total'] += block_size
+            self.stream_stats['true'] += bin(mask).count('1')
+
+            base = block * block_size
+            if filter_type == 'all':
+                rows = [decode_row(variables, base + i, (mask >> i) & 1) for i in range(block_size)]
+            else:
+                value = filter_type == 'true'
+                rows = [decode_row(variables, base + i, value)
+                        for i in iter_set_bits(mask, block_size, invert=not value)]
+            if rows:
+                yield rows
+
     def get_stats(self):
         """Возвращает статистику"""
-        if not self.results:
+        if self.table is not None:
+            # total, а не len(): у диаграмм решений строк может быть больше 2^63
+            total = self.table.total
+            true_count = self.table.count_true()
+        elif self.results:
+            total = len(self.results)
+            true_count = sum(1 for r in self.results if r['result'])
+        elif self.stream_stats:
+            total = self.stream_stats['total']
+            true_count = self.stream_stats['true']
+        else:
             return {}
-
-        true_count = sum(1 for r in self.results if r['result'])
-        false_count = len(self.results) - true_count
+        false_count = total - true_count
 
         return {
-            'total': len(self.results),
+            'total': total,
             'true': true_count,
             'false': false_count,
             'minority': 'True' if true_count < false_count else 'False' if false_count < true_count else 'Равно'
         }
 
+    def export_binary(self, path):
+        """
+        Сохраняет таблицу в упакованном виде: заголовок с именами переменных и по
+        одному биту на строку (24 переменные — 2 МБ). Открывается через load_binary.
+        """
+        if self.table is not None:
+            packed = self.table.packed()
+        elif self.results:
+            n = len(self.variables)
+            data = bytearray(((1 << n) + 7) // 8)
+            for r in self.results:
+                if r['result']:
+                    index = sum(int(bool(r[var])) << (n - 1 - j) for j, var in enumerate(self.variables))
+                    data[index >> 3] |= 1 << (index & 7)
+            packed = bytes(data)
+        else:
+            raise Exception("Нет вычисленной таблицы для сохранения.")
+        save_packed(path, self.variables, packed, self.table_expression)
+
+    def load_binary(self, path):
+        """
+        Открывает упакованный файл через mmap и делает его текущей таблицей:
+        строки, фильтры и статистика читаются из файла по мере надобности.
+        """
+        table = load_packed(path)
+        self._set_table(table)
+        self.variables = table.variables
+        self.expression = self.table_expression = table.expression
+        self.fictitious = []
+        self.stream_stats = None
+        return self.results
+
+    def export_csv(self, path, filter_type='all', expression=None):
+        """
+        Пишет строки таблицы в CSV по одной, не собирая их в память.
+        С expression таблица считается потоково через iter_rows, без calculate.
+        """
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            if expression is not None:
+                chunks = self.iter_rows(expression, filter_type=filter_type)
+                variables = compile_expression(expression).variables
+                rows = (row for chunk in chunks for row in chunk)
+            else:
+                variables = self.variables
+                rows = self.get_filtered_results(filter_type)
+            writer.writerow(list(variables) + ['result'])
+            for row in rows:
+                writer.writerow([row[var] for var in variables] + [int(row['result'])])
+
+    def compare(self, expr_a, expr_b):
+        """
+        Сравнивает два выражения на объединении их переменных (побитово, без списков строк).
+        Возвращает словарь: equivalent, variables, differences (число различающихся строк)
+        и counterexamples — ленивый поток строк с полями result_a и result_b.
+        """
+        compiled_a = compile_expression(expr_a)
+        compiled_b = compile_expression(expr_b)
+        variables = sorted(set(compiled_a.variables) | set(compiled_b.variables))
+        mask_a = compiled_a.evaluate_bits(variables)
+        mask_b = compiled_b.evaluate_bits(variables)
+        diff = mask_a ^ mask_b
+        total = 1 << len(variables)
+
+        def counterexamples():
+            for index in iter_set_bits(diff, total):
+                row = decode_row(variables, index, (mask_a >> index) & 1)
+                row['result_a'] = row.pop('result')
+                row['result_b'] = not row['result_a']
+                yield row
+
+        return {
+            'equivalent': diff == 0,
+            'variables': variables,
+            'differences': bin(diff).count('1'),
+            'counterexamples': counterexamples(),
+        }
+
+    def is_satisfiable(self, expression, filter_type='true', max_conflicts=None):
+        """
+        SAT-режим: есть ли в таблице выражения хотя бы одна строка фильтра
+        'true' или 'false'. Таблица при этом не строится.
+        """
+        return bool(self.find_rows(expression, 1, filter_type, max_conflicts))
+
+    def find_rows(self, expression, limit=10, filter_type='true', max_conflicts=None):
+        """
+        SAT-режим: до limit различных строк таблицы с заданным значением ('true'/'false').
+        Каждая найденная строка запрещается дизъюнктом, и решатель ищет следующую.
+        """
+        cnf, solver, root = self._sat_solver(expression)
+        value_lit = self._sat_result_literal(root, filter_type)
+        rows = []
+        while len(rows) < limit:
+            status = solver.solve([value_lit], max_conflicts)
+            if status is None:
+                raise Exception("Превышен лимит конфликтов SAT-решателя.")
+            if not status:
+                break
+            row = {var: int(solver.model[i + 1] == 1) for i, var in enumerate(cnf.variables)}
+            row['result'] = filter_type == 'true'
+            rows.append(row)
+            solver.add_clause([-(i + 1) if row[var] else i + 1 for i, var in enumerate(cnf.variables)])
+        return rows
+
+    def is_row_consistent(self, expression, row, max_conflicts=None):
+        """
+        SAT-режим: можно ли дополнить строку до строки таблицы выражения.
+        row — словарь {переменная: 0/1/None}, необязательный ключ 'result'.
+        """
+        cnf, solver, root = self._sat_solver(expression)
+        unknown = sorted(set(row) - set(cnf.variables) - {'result'})
+        if unknown:
+            raise Exception(f"Переменных {unknown} нет в выражении.")
+        assumptions = [cnf.ids[var] if value else -cnf.ids[var]
+                       for var, value in row.items() if var != 'result' and value is not None]
+        if row.get('result') is not None:
+            assumptions.append(root if row['result'] else -root)
+        status = solver.solve(assumptions, max_conflicts)
+        if status is None:
+            raise Exception("Превышен лимит конфликтов SAT-решателя.")
+        return status
+
+    def _sat_solver(self, expression):
+        variables = self._extract_variables(expression)
+        if not variables:
+            raise Exception("Не удалось найти переменные в выражении.")
+        cnf = expression_cnf(expression)
+        return cnf, CDCLSolver(cnf.num_vars, cnf.clauses), cnf.root
+
+    @staticmethod
+    def _sat_result_literal(root, filter_type):
+        if filter_type == 'true':
+            return root
+        if filter_type == 'false':
+            return -root
+        raise ValueError(f"В SAT-режиме доступны только фильтры 'true' и 'false', получено: {filter_type}")
+
     def create_expression_from_table(self, custom_results=None):
-        """Создает выражение из таблицы истинности (упрощенная версия)"""
+        """Создает минимальную ДНФ по таблице истинности (Куайн — Мак-Класки / Espresso)"""
         results = custom_results or self.results
-        true_results = [r for r in results if r['result']]
+        num_vars = len(self.variables)
+
+        if isinstance(results, BitTable):
+            minterms = [int(i) for i in results.iter_indices(True)]
+            total = len(results)
+        else:
+            minterms = [sum(int(bool(r[var])) << (num_vars - 1 - j) for j, var in enumerate(self.variables))
+                        for r in results if r['result']]
+            total = len(results)
 
-        if not true_results:
+        if not minterms:
             return "False"
-        if len(true_results) == len(results):
+        if len(minterms) == total:
             return "True"
 
-        terms = []
-        for r in true_results:
-            term_parts = []
-            for var in self.variables:
-                if r[var]:
-                    term_parts.append(var)
-                else:
-                    term_parts.append(f"not {var}")
-            terms.append(f"({' and '.join(term_parts)})")
-
-        return " or ".join(terms)
+        expression = format_dnf(self.variables, minimize(minterms, num_vars))
+        # Прогреваем кэш: восстановленное выражение обычно сразу же пересчитывается
+        compile_expression(expression)
+        return expression
 
     def solve_ege_task(self, expression, incomplete_table):
         """
         Решает задачу ЕГЭ: определяет соответствие переменных по неполной таблице.
-        Значения в таблице могут быть 0, 1 или None (неизвестно).
-        """
-        variables = sorted(self._extract_variables(expression))
-        if len(variables) != 4:
-            raise Exception(f"Выражение должно содержать ровно 4 переменные, найдено: {variables}")
-
-        # Генерируем полную таблицу истинности для выражения
-        full_table = []
-        for x1 in range(2):
-            for x2 in range(2):
-                for x3 in range(2):
-                    for x4 in range(2):
-                        # Создаем словарь для eval(), где ключи - имена переменных
-                        local_vars = {
-                            variables[0]: x1,
-                            variables[1]: x2,
-                            variables[2]: x3,
-                            variables[3]: x4
-                        }
-                        result = eval(expression, {"__builtins__": {}}, local_vars)
-
-                        row = local_vars
-                        row['result'] = bool(result)
-                        full_table.append(row)
-
-        columns = ['F1', 'F2', 'F3', 'F4']
+        Значения в таблице могут быть 0, 1 или None (неизвестно), столбцы называются
+        F1..Fn (n — число переменных, от 3 до 8), значение функции у строк может различаться.
+
+        Соответствие столбцов переменным ищется перебором с отсечениями: для каждой
+        строки задачи хранится маска подходящих строк полной таблицы, после каждого
+        назначения маски сужаются, а паросочетание проверяет, что строкам задачи
+        можно сопоставить различные строки таблицы.
+        """
+        compiled = compile_expression(expression)
+        variables = compiled.variables
+        num_vars = len(variables)
+        if not MIN_EGE_VARS <= num_vars <= MAX_EGE_VARS:
+            raise Exception(f"Выражение должно содержать от {MIN_EGE_VARS} до {MAX_EGE_VARS} переменных, "
+                            f"найдено: {variables}")
+
+        columns = [f'F{i + 1}' for i in range(num_vars)]
+        extra = sorted({key for row in incomplete_table for key in row} - set(columns) - {'result'})
+        if extra:
+            raise Exception(f"В таблице есть лишние столбцы {extra}: для {num_vars} переменных нужны {columns}")
+
+        # Полная таблица в битовом виде: бит i — строка i стандартной таблицы
+        full = (1 << (1 << num_vars)) - 1
+        var_masks = dict(zip(variables, variable_masks(num_vars)))
+        result_mask = compiled.evaluate_bits()
+
+        initial = [result_mask if row['result'] else full ^ result_mask for row in incomplete_table]
+        if not self._rows_can_match(initial):
+            return []
+
+        # Сначала назначаем столбцы с наибольшим числом известных значений
+        order = sorted(range(num_vars),
+                       key=lambda c: -sum(1 for row in incomplete_table if row.get(columns[c]) is not None))
+        assigned = [None] * num_vars
         solutions = []
 
-        # Перебираем все возможные перестановки переменных по столбцам
-        for p_vars in permutations(variables):
-            # p_vars - это гипотеза, например ('y', 'x', 'w', 'z')
-            # Это значит, что F1=y, F2=x, F3=w, F4=z
-
-            # Фильтруем полную таблицу, оставляя только строки, которые могут соответствовать
-            # фрагменту из задачи (по значению функции)
-            target_result = incomplete_table[0]['result']
-            candidate_rows = [row for row in full_table if row['result'] == target_result]
-
-            # Если кандидатов меньше, чем строк в задаче, гипотеза неверна
-            if len(candidate_rows) < len(incomplete_table):
-                continue
-
-            # Теперь нужно проверить, можно ли сопоставить строки из задачи
-            # с уникальными строками из числа кандидатов
-
-            # Перебираем все комбинации строк-кандидатов
-            for p_rows in permutations(candidate_rows, len(incomplete_table)):
-                is_valid_mapping = True
-                # Сопоставляем i-ю строку из задачи с i-й строкой из комбинации кандидатов
-                for i in range(len(incomplete_table)):
-                    problem_row = incomplete_table[i]
-                    candidate_row = p_rows[i]
-
-                    # Проверяем на противоречия
-                    for col_idx, col_name in enumerate(columns):
-                        var_for_this_col = p_vars[col_idx]
-                        problem_value = problem_row[col_name]
-                        candidate_value = candidate_row[var_for_this_col]
-
-                        # Если в задаче есть значение, и оно не совпадает с кандидатом - это противоречие
-                        if problem_value is not None and problem_value != candidate_value:
-                            is_valid_mapping = False
+        def search(depth, candidates, used):
+            if depth == num_vars:
+                solutions.append("".join(assigned))
+                return
+            col = order[depth]
+            for var in variables:
+                if var in used:
+                    continue
+                narrowed = []
+                for row, cand in zip(incomplete_table, candidates):
+                    value = row.get(columns[col])
+                    if value is not None:
+                        cand &= var_masks[var] if value else full ^ var_masks[var]
+                        if not cand:
                             break
-                    if not is_valid_mapping:
-                        break
+                    narrowed.append(cand)
+                else:
+                    if self._rows_can_match(narrowed):
+                        assigned[col] = var
+                        search(depth + 1, narrowed, used | {var})
+                        assigned[col] = None
+
+        search(0, initial, frozenset())
+        return sorted(solutions)
+
+    @staticmethod
+    def _rows_can_match(candidates):
+        """Есть ли паросочетание: каждой строке задачи — своя строка таблицы из её маски (алгоритм Куна)."""
+        owner = {}
 
-                # Если для этой комбинации строк все сошлось, значит гипотеза о переменных верна
-                if is_valid_mapping:
-                    solution_str = "".join(p_vars)
-                    if solution_str not in solutions:
-                        solutions.append(solution_str)
+        def try_row(i, seen):
+            mask = candidates[i]
+            while mask:
+                bit = mask & -mask
+                mask ^= bit
+                if bit in seen:
+                    continue
+                seen.add(bit)
+                if bit not in owner or try_row(owner[bit], seen):
+                    owner[bit] = i
+                    return True
+            return False
 
-        return solutions
+        return all(try_row(i, set()) for i in range(len(candidates)))
 
     def _extract_variables(self, expression):
         """Извлекает уникальные переменные из выражения"""
-        # Ищем буквы/слова, которые не являются ключевыми словами
-        keywords = {'and', 'or', 'not', 'True', 'False'}
-        tokens = re.findall(r'[A-Za-z_][A-Za-z0-9_]*', expression)
-        variables = sorted(list(set(token for token in tokens if token not in keywords)))
-        return variables
+        return list(compile_expression(expression).variables)
+
+
+# ------------------------- Пакетный режим (без интерфейса) -------------------------
+
+def _solve_task_line(line):
+    """Решает одну задачу из строки JSONL; ошибки возвращаются в ответе, а не прерывают пакет."""
+    t0 = time.perf_counter()
+    answer = {}
+    try:
+        task = json.loads(line)
+        answer = {key: value for key, value in task.items() if key not in ('expression', 'incomplete_table')}
+        table = [dict(row, result=bool(row['result'])) for row in task['incomplete_table']]
+        answer['solutions'] = TruthTableCalculator().solve_ege_task(task['expression'], table)
+    except Exception as e:
+        answer['error'] = str(e)
+    answer['time'] = round(time.perf_counter() - t0, 6)
+    return answer
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Пакетное решение задач ЕГЭ на восстановление столбцов таблицы истинности.")
+    parser.add_argument('tasks', help="JSONL: по строке {\"expression\": ..., \"incomplete_table\": [...]}")
+    parser.add_argument('-o', '--output', help="куда писать ответы JSONL (по умолчанию stdout)")
+    parser.add_argument('-w', '--workers', type=int, default=None, help="число процессов (по умолчанию — все ядра)")
+    args = parser.parse_args(argv)
+
+    with open(args.tasks, encoding='utf-8') as f:
+        lines = [line for line in f if line.strip()]
+
+    out = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    try:
+        with ProcessPoolExecutor(max_workers=args.workers) as executor:
+            chunksize = max(1, len(lines) // ((args.workers or os.cpu_count() or 1) * 16))
+            for answer in executor.map(_solve_task_line, lines, chunksize=chunksize):
+                out.write(json.dumps(answer, ensure_ascii=False) + '\n')
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
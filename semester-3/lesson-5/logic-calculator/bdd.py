@@ -0,0 +1,186 @@
+"""Упорядоченные сокращённые диаграммы решений (ROBDD) для логических выражений.
+
+Диаграмма позволяет считать число истинных строк, сравнивать выражения и
+перечислять строки, не строя таблицу из 2^n строк — это работает и для 40-60 переменных.
+"""
+
+FALSE = 0
+TRUE = 1
+
+
+class BDD:
+    """
+    Менеджер диаграмм с таблицей уникальности и кэшем вычисленных операций.
+    Порядок переменных совпадает с порядком столбцов таблицы: уровень 0 — первая
+    переменная (старший бит номера строки). Узел — целое число, 0 и 1 — терминалы.
+    """
+
+    def __init__(self, variables):
+        self.variables = list(variables)
+        self.num_vars = len(self.variables)
+        self.levels = {var: i for i, var in enumerate(self.variables)}
+        # nodes[u] = (уровень, младший потомок, старший потомок); у терминалов уровень = n
+        self.nodes = [(self.num_vars, FALSE, FALSE), (self.num_vars, TRUE, TRUE)]
+        self.unique = {}
+        self.computed = {}
+        self._count_cache = {FALSE: 0, TRUE: 1}
+
+    # ------------------------------ построение ------------------------------
+
+    def level(self, u):
+        return self.nodes[u][0]
+
+    def mk(self, level, low, high):
+        if low == high:
+            return low
+        key = (level, low, high)
+        u = self.unique.get(key)
+        if u is None:
+            u = len(self.nodes)
+            self.nodes.append(key)
+            self.unique[key] = u
+        return u
+
+    def var(self, name):
+        return self.mk(self.levels[name], FALSE, TRUE)
+
+    def apply(self, op, a, b):
+        """Бинарная операция 'and' / 'or' / 'xor' по алгоритму Брайанта."""
+        if op == 'and':
+            if a == FALSE or b == FALSE:
+                return FALSE
+            if a == TRUE:
+                return b
+            if b == TRUE or a == b:
+                return a
+        elif op == 'or':
+            if a == TRUE or b == TRUE:
+                return TRUE
+            if a == FALSE:
+                return b
+            if b == FALSE or a == b:
+                return a
+        elif op == 'xor':
+            if a == b:
+                return FALSE
+            if a == FALSE:
+                return b
+            if b == FALSE:
+                return a
+        else:
+            raise ValueError(f"Неизвестная операция BDD: {op}")
+
+        # Операции коммутативны — нормализуем ключ кэша
+        if a > b:
+            a, b = b, a
+        key = (op, a, b)
+        cached = self.computed.get(key)
+        if cached is not None:
+            return cached
+
+        level_a, low_a, high_a = self.nodes[a]
+        level_b, low_b, high_b = self.nodes[b]
+        level = min(level_a, level_b)
+        if level_a != level:
+            low_a = high_a = a
+        if level_b != level:
+            low_b = high_b = b
+        result = self.mk(level, self.apply(op, low_a, low_b), self.apply(op, high_a, high_b))
+        self.computed[key] = result
+        return result
+
+    def negate(self, a):
+        return self.apply('xor', a, TRUE)
+
+    def build(self, dag, root):
+        """Диаграмма по графу подвыражений (см. expression.ExpressionDag): каждый узел — один раз."""
+        built = {}
+        for node in dag.topological(root):
+            op, arg = dag.nodes[node]
+            if op == 'var':
+                result = self.var(arg)
+            elif op == 'const':
+                result = TRUE if arg else FALSE
+            else:
+                args = [built[c] for c in arg]
+                if op == 'not':
+                    result = self.negate(args[0])
+                elif op in ('and', 'or'):
+                    result = args[0]
+                    for other in args[1:]:
+                        result = self.apply(op, result, other)
+                elif op == 'xor':
+                    result = self.apply('xor', args[0], args[1])
+                elif op == 'eq':
+                    result = self.negate(self.apply('xor', args[0], args[1]))
+                elif op == 'imp':
+                    result = self.apply('or', self.negate(args[0]), args[1])
+                else:
+                    raise ValueError(f"Неизвестная операция: {op}")
+            built[node] = result
+        return built[root]
+
+    # ------------------------------- запросы -------------------------------
+
+    def _count(self, u):
+        cached = self._count_cache.get(u)
+        if cached is not None:
+            return cached
+        level, low, high = self.nodes[u]
+        result = (self._count(low) << (self.level(low) - level - 1)) + \
+                 (self._count(high) << (self.level(high) - level - 1))
+        self._count_cache[u] = result
+        return result
+
+    def sat_count(self, u):
+        """Число наборов всех n переменных, на которых функция истинна."""
+        return self._count(u) << self.level(u)
+
+    def support(self, u):
+        """Переменные, от которых функция действительно зависит (уровни узлов диаграммы)."""
+        levels = set()
+        stack = [u]
+        seen = set()
+        while stack:
+            node = stack.pop()
+            if node <= TRUE or node in seen:
+                continue
+            seen.add(node)
+            level, low, high = self.nodes[node]
+            levels.add(level)
+            stack += [low, high]
+        return [self.variables[level] for level in sorted(levels)]
+
+    @staticmethod
+    def equivalent(a, b):
+        """Диаграммы канонические: функции равны тогда и только тогда, когда равны узлы."""
+        return a == b
+
+    def evaluate(self, u, index):
+        """Значение функции на строке с номером index (первая переменная — старший бит)."""
+        while u > TRUE:
+            level, low, high = self.nodes[u]
+            u = high if (index >> (self.num_vars - 1 - level)) & 1 else low
+        return u
+
+    def iter_indices(self, u, value=True):
+        """Лениво перечисляет номера строк со значением value по возрастанию."""
+        target = TRUE if value else FALSE
+        n = self.num_vars
+
+        def walk(node, level, prefix):
+            if node <= TRUE:
+                if node == target:
+                    width = n - level
+                    yield from range(prefix << width, (prefix + 1) << width)
+                return
+            node_level, low, high = self.nodes[node]
+            if node_level > level:
+                # Переменная не влияет на этой ветви: перебираем оба значения
+                yield from walk(node, level + 1, prefix << 1)
+                yield from walk(node, level + 1, (prefix << 1) | 1)
+            else:
+                yield from walk(low, level + 1, prefix << 1)
+                yield from walk(high, level + 1, (prefix << 1) | 1)
+
+        return walk(u, 0, 0)
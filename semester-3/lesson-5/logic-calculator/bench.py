@@ -0,0 +1,217 @@
+"""Воспроизводимые замеры TruthTableCalculator.
+
+Выражения и неполные таблицы генерируются из фиксированного зерна, поэтому
+прогоны на разных версиях кода сравнимы между собой. Для каждого замера
+выводятся время (лучшее из --repeat запусков), пиковая память (tracemalloc,
+отдельный запуск) и число строк в секунду. Результат — JSON:
+
+    python bench.py --max-vars 22 -o bench.json
+
+Режим 'eval' — исходный способ расчёта (eval на каждую строку, список словарей),
+он нужен как точка отсчёта для остальных режимов.
+"""
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from itertools import product
+
+from backend import TruthTableCalculator, MIN_EGE_VARS, MAX_EGE_VARS
+from expression import compile_expression, compile_outputs
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+SEED = 2024
+# Предел переменных для режимов, которые строят список словарей или идут построчно
+ROW_MODES_MAX_VARS = {'eval': 16, 'compiled': 18, 'gray': 18}
+FILTERS = ('all', 'true', 'false', 'minority')
+FILTER_MAX_VARS = 18
+RESTORE_MAX_VARS = 10
+EGE_VARS = 6
+EGE_ROWS = (2, 3, 4, 6, 8, 12)
+
+
+def make_expression(num_vars, seed=SEED):
+    """Случайное выражение, в котором каждая из num_vars переменных встречается хотя бы раз."""
+    rng = random.Random(seed * 1000 + num_vars)
+    variables = [f"x{i + 1}" for i in range(num_vars)]
+    order = variables[:]
+    rng.shuffle(order)
+    order += rng.sample(variables, max(1, num_vars // 2))
+
+    terms = []
+    for k in range(0, len(order) - 1, 2):
+        a, b = order[k], order[k + 1]
+        template = rng.choice(["({a} and not {b})", "({a} <= {b})", "({a} == {b})", "({a} != {b})",
+                               "(not {a} or {b})"])
+        terms.append(template.format(a=a, b=b))
+    if len(order) % 2:
+        terms.append(order[-1])
+
+    expression = terms[0]
+    for term in terms[1:]:
+        expression = f"({expression} {rng.choice(['and', 'or', 'or'])} {term})"
+    return expression
+
+
+def make_ege_table(expression, rows, seed=SEED):
+    """Неполная таблица задачи ЕГЭ: rows различных строк, столбцы переставлены, часть значений скрыта."""
+    rng = random.Random(seed + rows)
+    compiled = compile_expression(expression)
+    num_vars = len(compiled.variables)
+    mask = compiled.evaluate_bits()
+    permutation = rng.sample(range(num_vars), num_vars)
+    table = []
+    for index in rng.sample(range(1 << num_vars), rows):
+        bits = [(index >> (num_vars - 1 - j)) & 1 for j in range(num_vars)]
+        row = {f"F{c + 1}": bits[permutation[c]] if rng.random() < 0.6 else None for c in range(num_vars)}
+        row['result'] = bool((mask >> index) & 1)
+        table.append(row)
+    return table
+
+
+def eval_table(expression, variables):
+    """Исходная реализация: eval на каждую строку и список словарей."""
+    results = []
+    for bits in product((0, 1), repeat=len(variables)):
+        row = dict(zip(variables, bits))
+        row['result'] = bool(eval(expression, {"__builtins__": {}}, dict(row)))
+        results.append(row)
+    return results
+
+
+def reset_caches():
+    """Сбрасывает кэши компиляции и столбцов, чтобы повторный запуск считал всё заново."""
+    compile_expression.cache_clear()
+    compile_outputs.cache_clear()
+
+
+def measure(fn, repeat):
+    """(лучшее время, пиковая память) для fn(); каждый запуск — с чистыми кэшами."""
+    best = None
+    for _ in range(repeat):
+        reset_caches()
+        t0 = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+
+    reset_caches()
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return best, peak
+
+
+def record(results, bench, seconds, peak, rows=None, **params):
+    entry = dict(bench=bench, **params, seconds=round(seconds, 6), peak_bytes=peak)
+    if rows is not None:
+        entry['rows'] = rows
+        entry['rows_per_second'] = round(rows / seconds) if seconds > 0 else None
+    results.append(entry)
+    print(json.dumps(entry, ensure_ascii=False), file=sys.stderr)
+
+
+def bench_calculate(results, modes, min_vars, max_vars, repeat):
+    for num_vars in range(min_vars, max_vars + 1):
+        expression = make_expression(num_vars)
+        variables = [f"x{i + 1}" for i in range(num_vars)]
+        for mode in modes:
+            if num_vars > ROW_MODES_MAX_VARS.get(mode, max_vars):
+                continue
+            if mode == 'eval':
+                fn = lambda: eval_table(expression, variables)
+            else:
+                fn = lambda: TruthTableCalculator().calculate(expression, mode=mode)
+            seconds, peak = measure(fn, repeat)
+            record(results, 'calculate', seconds, peak, rows=1 << num_vars, mode=mode, vars=num_vars)
+
+
+def bench_filters(results, modes, min_vars, max_vars, repeat):
+    for num_vars in range(min_vars, min(max_vars, FILTER_MAX_VARS) + 1):
+        expression = make_expression(num_vars)
+        for mode in modes:
+            if mode == 'eval' or num_vars > ROW_MODES_MAX_VARS.get(mode, max_vars):
+                continue
+            calculator = TruthTableCalculator()
+            calculator.calculate(expression, mode=mode)
+            for filter_type in FILTERS:
+                def fn():
+                    rows = calculator.get_filtered_results(filter_type)
+                    # Ленивые представления обходим по номерам строк, списки — целиком
+                    indices = getattr(rows, 'indices', None)
+                    return sum(1 for _ in (indices() if indices else rows))
+                seconds, peak = measure(fn, repeat)
+                record(results, 'filter', seconds, peak, rows=1 << num_vars,
+                       mode=mode, vars=num_vars, filter=filter_type)
+
+
+def bench_restore(results, min_vars, max_vars, repeat):
+    for num_vars in range(min_vars, min(max_vars, RESTORE_MAX_VARS) + 1):
+        expression = make_expression(num_vars)
+        calculator = TruthTableCalculator()
+        calculator.calculate(expression, mode='bits')
+        # Замер имеет смысл, только если восстановленное выражение задаёт ту же функцию
+        restored = calculator.create_expression_from_table()
+        assert calculator.compare(expression, restored)['equivalent'], (num_vars, restored)
+        seconds, peak = measure(calculator.create_expression_from_table, repeat)
+        record(results, 'create_expression_from_table', seconds, peak, rows=1 << num_vars, vars=num_vars)
+
+
+def bench_ege(results, repeat):
+    expression = make_expression(EGE_VARS)
+    assert MIN_EGE_VARS <= EGE_VARS <= MAX_EGE_VARS
+    for rows in EGE_ROWS:
+        table = make_ege_table(expression, rows)
+        calculator = TruthTableCalculator()
+        seconds, peak = measure(lambda: calculator.solve_ege_task(expression, table), repeat)
+        record(results, 'solve_ege_task', seconds, peak, vars=EGE_VARS, table_rows=rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Замеры калькулятора таблиц истинности (JSON).")
+    parser.add_argument('--min-vars', type=int, default=4)
+    parser.add_argument('--max-vars', type=int, default=22)
+    parser.add_argument('--repeat', type=int, default=3, help="запусков на замер (берётся лучшее время)")
+    parser.add_argument('--modes', nargs='+', default=['eval', 'compiled', 'bits', 'numpy', 'bdd', 'gray'])
+    parser.add_argument('--only', nargs='+', choices=['calculate', 'filter', 'restore', 'ege'],
+                        default=['calculate', 'filter', 'restore', 'ege'])
+    parser.add_argument('-o', '--output', help="файл для JSON (по умолчанию stdout)")
+    args = parser.parse_args(argv)
+
+    modes = [m for m in args.modes if m != 'numpy' or np is not None]
+    results = []
+    if 'calculate' in args.only:
+        bench_calculate(results, modes, args.min_vars, args.max_vars, args.repeat)
+    if 'filter' in args.only:
+        bench_filters(results, modes, args.min_vars, args.max_vars, args.repeat)
+    if 'restore' in args.only:
+        bench_restore(results, args.min_vars, args.max_vars, args.repeat)
+    if 'ege' in args.only:
+        bench_ege(results, args.repeat)
+
+    report = {
+        'python': platform.python_version(),
+        'numpy': np.__version__ if np is not None else None,
+        'seed': SEED,
+        'results': results,
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,559 @@
+import ast
+import threading
+import weakref
+from collections import OrderedDict
+from functools import lru_cache
+from itertools import product
+
+
+# Допустимые операции выражения. Всё остальное (вызовы, атрибуты, арифметика)
+# отклоняется ещё на этапе разбора, поэтому eval() больше не нужен.
+_BIN_OPS = {ast.BitAnd: 'and', ast.BitOr: 'or', ast.BitXor: 'xor'}
+_BOOL_OPS = {ast.And: 'and', ast.Or: 'or'}
+
+
+def _compare(op, a, b):
+    """Сравнение двух логических значений в терминах базовых операций."""
+    if isinstance(op, ast.Eq):
+        return ('eq', a, b)
+    if isinstance(op, ast.NotEq):
+        return ('xor', a, b)
+    if isinstance(op, ast.LtE):  # импликация a -> b
+        return ('imp', a, b)
+    if isinstance(op, ast.GtE):  # импликация b -> a
+        return ('imp', b, a)
+    if isinstance(op, ast.Lt):
+        return ('and', ('not', a), b)
+    if isinstance(op, ast.Gt):
+        return ('and', a, ('not', b))
+    raise ValueError(f"Недопустимое сравнение в выражении: {type(op).__name__}")
+
+
+def _convert(node):
+    """Переводит узел Python AST в дерево из кортежей вида (операция, *аргументы)."""
+    if isinstance(node, ast.Name):
+        if node.id in ('True', 'False'):
+            return ('const', int(node.id == 'True'))
+        return ('var', node.id)
+
+    if isinstance(node, ast.Constant):
+        if node.value in (0, 1) and isinstance(node.value, (bool, int)):
+            return ('const', int(node.value))
+        raise ValueError(f"Недопустимая константа в выражении: {node.value!r}")
+
+    if isinstance(node, ast.BoolOp):
+        return (_BOOL_OPS[type(node.op)],) + tuple(_convert(v) for v in node.values)
+
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+        return ('not', _convert(node.operand))
+
+    if isinstance(node, ast.BinOp) and type(node.op) in _BIN_OPS:
+        return (_BIN_OPS[type(node.op)], _convert(node.left), _convert(node.right))
+
+    if isinstance(node, ast.Compare):
+        # Цепочка a == b == c означает (a == b) and (b == c), как в Python
+        operands = [_convert(node.left)] + [_convert(c) for c in node.comparators]
+        parts = [_compare(op, operands[i], operands[i + 1]) for i, op in enumerate(node.ops)]
+        return parts[0] if len(parts) == 1 else ('and',) + tuple(parts)
+
+    raise ValueError(f"Недопустимая конструкция в выражении: {type(node).__name__}")
+
+
+def parse_expression(source):
+    """Разбирает выражение в синтаксисе Python и возвращает дерево операций."""
+    try:
+        tree = ast.parse(source.strip(), mode='eval')
+    except SyntaxError as e:
+        raise ValueError(f"Синтаксическая ошибка в выражении: {e.msg}") from None
+    return _convert(tree.body)
+
+
+def substitute_variables(source, values):
+    """Текст выражения, в котором переменные из values заменены константами True/False."""
+    tree = ast.parse(source.strip(), mode='eval')
+    for node in ast.walk(tree):
+        for field, child in ast.iter_fields(node):
+            if isinstance(child, ast.Name) and child.id in values:
+                setattr(node, field, ast.Constant(bool(values[child.id])))
+            elif isinstance(child, list):
+                child[:] = [ast.Constant(bool(values[c.id])) if isinstance(c, ast.Name) and c.id in values else c
+                            for c in child]
+    return ast.unparse(tree)
+
+
+# Коммутативные операции: порядок аргументов не важен, сортируем их для хэш-консинга
+_COMMUTATIVE = {'and', 'or', 'xor', 'eq'}
+
+# Код узла на побитовых операциях. Истина обозначается маской _M: для одной строки
+# это 1, для битовых векторов — число из 2^n единиц, поэтому один и тот же код
+# годится для обоих режимов.
+_NODE_CODE = {
+    'not': lambda a: f"{a[0]} ^ _M",
+    'and': lambda a: " & ".join(a),
+    'or': lambda a: " | ".join(a),
+    'xor': lambda a: f"{a[0]} ^ {a[1]}",
+    'eq': lambda a: f"{a[0]} ^ {a[1]} ^ _M",
+    'imp': lambda a: f"({a[0]} ^ _M) | {a[1]}",
+}
+
+
+# Предел памяти под кэши столбцов подвыражений всех скомпилированных выражений (в байтах)
+COLUMN_CACHE_BYTES = 64 * 1024 * 1024
+# Если маски всех узлов не помещаются в этот предел, таблица считается кусками по 2^N строк
+COLUMN_BLOCK_VARS = 16
+
+
+class ExpressionDag:
+    """
+    Хэш-консинг подвыражений: одинаковые поддеревья (в том числе из разных выражений)
+    становятся одним узлом. Узел — номер в self.nodes, где хранится пара
+    (операция, аргумент): имя для 'var', 0/1 для 'const', кортеж номеров потомков иначе.
+    Потомки всегда получают номера раньше родителей.
+    """
+
+    def __init__(self):
+        self.nodes = []
+        self.unique = {}
+
+    def _make(self, op, arg):
+        key = (op, arg)
+        node = self.unique.get(key)
+        if node is None:
+            node = len(self.nodes)
+            self.nodes.append(key)
+            self.unique[key] = node
+        return node
+
+    def add(self, tree):
+        """Добавляет дерево из parse_expression и возвращает номер его корня."""
+        op = tree[0]
+        if op in ('var', 'const'):
+            return self._make(op, tree[1])
+        children = [self.add(child) for child in tree[1:]]
+        if op == 'not' and self.nodes[children[0]][0] == 'not':
+            return self.nodes[children[0]][1][0]  # not not a == a
+        if op in ('and', 'or'):
+            children = sorted(set(children))
+            if len(children) == 1:
+                return children[0]
+        elif op in _COMMUTATIVE:
+            children.sort()
+        return self._make(op, tuple(children))
+
+    def topological(self, root):
+        """Узлы, от которых зависит root, в порядке «потомки раньше родителей»."""
+        seen = set()
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            if node in seen:
+                continue
+            seen.add(node)
+            op, arg = self.nodes[node]
+            if op not in ('var', 'const'):
+                stack.extend(arg)
+        return sorted(seen)
+
+    def variables(self, root):
+        return sorted(self.nodes[n][1] for n in self.topological(root) if self.nodes[n][0] == 'var')
+
+    def extract(self, root):
+        """
+        Новый граф только с подвыражениями root (чтобы граф не рос бесконечно).
+        Возвращает (граф, {старый узел: новый}); порядок номеров сохраняется,
+        поэтому упорядоченные кортежи потомков остаются упорядоченными.
+        """
+        dag = ExpressionDag()
+        mapping = {}
+        for node in self.topological(root):
+            op, arg = self.nodes[node]
+            if op not in ('var', 'const'):
+                arg = tuple(mapping[c] for c in arg)
+            mapping[node] = dag._make(op, arg)
+        return dag, mapping
+
+    def source(self, roots, variables, name='_f'):
+        """
+        Код функции name(_M, _v0, _v1, ...): каждый уникальный узел вычисляется
+        один раз во временную переменную. Возвращается значение узла roots[0]
+        или кортеж значений, если корней несколько.
+        """
+        names = {var: f"_v{i}" for i, var in enumerate(variables)}
+        order = sorted(set().union(*(self.topological(r) for r in roots)))
+        lines = []
+        for node in order:
+            op, arg = self.nodes[node]
+            if op == 'var':
+                names[node] = names[arg]
+            elif op == 'const':
+                names[node] = '_M' if arg else '0'
+            else:
+                lines.append(f"    _t{node} = {_NODE_CODE[op]([names[c] for c in arg])}")
+                names[node] = f"_t{node}"
+        result = ", ".join(names[r] for r in roots)
+        params = ", ".join(['_M'] + [f"_v{i}" for i in range(len(variables))])
+        return f"def {name}({params}):\n" + "".join(line + "\n" for line in lines) + f"    return {result}\n"
+
+    def evaluate_bits(self, root, variables, cache=None):
+        """
+        Маска таблицы узла root (бит i — строка i) по столбцам variables.
+        cache — словарь {узел: маска} для этого же набора столбцов: уже посчитанные
+        узлы берутся из него, новые в него дописываются. Если маски всех узлов root
+        больше COLUMN_CACHE_BYTES, таблица считается кусками подряд идущих строк
+        и в cache дописывается только маска root: полные маски промежуточных узлов
+        не держатся в памяти даже на время расчёта.
+        """
+        cache = {} if cache is None else cache
+        if root in cache:
+            return cache[root]
+        needed = self.topological(root)
+        order = [node for node in needed if node not in cache]
+        num_vars = len(variables)
+        if len(needed) * (1 << num_vars) // 8 <= COLUMN_CACHE_BYTES:
+            masks = dict(zip(variables, variable_masks(num_vars)))
+            self._evaluate_masks(order, masks, (1 << (1 << num_vars)) - 1, cache)
+            return cache[root]
+
+        low_vars = min(num_vars, COLUMN_BLOCK_VARS)
+        high_vars = num_vars - low_vars
+        full = (1 << (1 << low_vars)) - 1
+        low_masks = list(zip(variables[high_vars:], variable_masks(low_vars)))
+        # Узлы из cache, которые нужны новым узлам: от них берутся куски масок
+        inputs = {child for node in order if self.nodes[node][0] not in ('var', 'const')
+                  for child in self.nodes[node][1] if child in cache}
+        parts = []
+        for block in range(1 << high_vars):
+            shift = block << low_vars
+            masks = {var: full if (block >> (high_vars - 1 - j)) & 1 else 0
+                     for j, var in enumerate(variables[:high_vars])}
+            masks.update(low_masks)
+            values = {node: (cache[node] >> shift) & full for node in inputs}
+            self._evaluate_masks(order, masks, full, values)
+            parts.append(values[root].to_bytes(1 << (low_vars - 3), 'little'))
+        cache[root] = int.from_bytes(b"".join(parts), 'little')
+        return cache[root]
+
+    def _evaluate_masks(self, order, masks, full, values):
+        """Дописывает в values маски узлов order (потомки — из values, переменные — из masks)."""
+        for node in order:
+            op, arg = self.nodes[node]
+            if op == 'var':
+                value = masks[arg]
+            elif op == 'const':
+                value = full if arg else 0
+            else:
+                vals = [values[c] for c in arg]
+                if op == 'not':
+                    value = vals[0] ^ full
+                elif op == 'and':
+                    value = vals[0]
+                    for v in vals[1:]:
+                        value &= v
+                elif op == 'or':
+                    value = vals[0]
+                    for v in vals[1:]:
+                        value |= v
+                elif op == 'xor':
+                    value = vals[0] ^ vals[1]
+                elif op == 'eq':
+                    value = vals[0] ^ vals[1] ^ full
+                else:  # imp
+                    value = (vals[0] ^ full) | vals[1]
+            values[node] = value
+
+
+class _ColumnBudget:
+    """
+    Общий на процесс учёт памяти кэшей столбцов. Скомпилированные выражения живут
+    в lru_cache, и отдельный предел на каждое давал бы сотни предельных кэшей;
+    здесь при превышении общего предела кэши давно не использованных выражений
+    сбрасываются (через их метод _drop_columns).
+    Владельцы кэшей хранятся по слабым ссылкам: учёт не держит выражения, которые
+    lru_cache уже выбросил, а их размер вычитается из суммы при следующем charge.
+    """
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.owners = OrderedDict()  # id владельца -> (слабая ссылка, размер кэша)
+        self.total = 0
+        # Ссылки умерших владельцев; колбэк weakref только дописывает сюда, а не
+        # трогает owners, потому что сборка мусора может начаться посреди charge
+        self.dead = []
+        self.lock = threading.Lock()
+
+    def charge(self, owner, size):
+        """Запоминает размер кэша owner и сбрасывает самые старые кэши сверх предела."""
+        key = id(owner)
+        with self.lock:
+            while self.dead:
+                dead_key, dead_ref = self.dead.pop()
+                entry = self.owners.get(dead_key)
+                if entry is not None and entry[0] is dead_ref:
+                    del self.owners[dead_key]
+                    self.total -= entry[1]
+
+            entry = self.owners.pop(key, None)
+            if entry is not None and entry[0]() is owner:
+                ref = entry[0]
+            else:
+                ref = weakref.ref(owner, lambda r, key=key: self.dead.append((key, r)))
+            if entry is not None:
+                self.total -= entry[1]
+            self.owners[key] = (ref, size)
+            self.total += size
+
+            evicted = []
+            while self.total > self.limit and len(self.owners) > 1:
+                _, (old_ref, old_size) = self.owners.popitem(last=False)
+                self.total -= old_size
+                old = old_ref()
+                if old is not None:
+                    evicted.append(old)
+        for old in evicted:
+            old._drop_columns()
+
+
+_COLUMN_BUDGET = _ColumnBudget(COLUMN_CACHE_BYTES)
+
+
+def variable_masks(num_vars):
+    """
+    Битовые маски переменных для режима битового параллелизма.
+    Бит i маски j равен значению j-й переменной в i-й строке стандартной таблицы:
+    у последней переменной чередуются одиночные биты, у первой — половины таблицы.
+    """
+    total = 1 << num_vars
+    masks = []
+    for j in range(num_vars):
+        half = 1 << (num_vars - 1 - j)
+        mask = ((1 << half) - 1) << half
+        length = 2 * half
+        # Размножаем шаблон удвоением, а не делением огромных чисел
+        while length < total:
+            mask |= mask << length
+            length *= 2
+        masks.append(mask)
+    return masks
+
+
+def fictitious_positions(mask, num_vars):
+    """
+    Номера фиктивных переменных таблицы-маски: у такой переменной положительный
+    и отрицательный кофакторы совпадают (сдвиг единичной половины на её длину
+    даёт ровно нулевую половину).
+    """
+    positions = []
+    for j, var_mask in enumerate(variable_masks(num_vars)):
+        half = 1 << (num_vars - 1 - j)
+        if (mask & var_mask) >> half == mask & ~var_mask:
+            positions.append(j)
+    return positions
+
+
+# Вычисление узла по значениям потомков (0/1) для пошагового режима
+_STEP_CODE = {
+    'not': lambda c: f"_s[{c[0]}] ^ 1",
+    'and': lambda c: " & ".join(f"_s[{i}]" for i in c),
+    'or': lambda c: " | ".join(f"_s[{i}]" for i in c),
+    'xor': lambda c: f"_s[{c[0]}] ^ _s[{c[1]}]",
+    'eq': lambda c: f"_s[{c[0]}] ^ _s[{c[1]}] ^ 1",
+    'imp': lambda c: f"(_s[{c[0]}] ^ 1) | _s[{c[1]}]",
+}
+
+
+_STEP_EVAL = {
+    'not': lambda v: v[0] ^ 1,
+    'and': lambda v: int(all(v)),
+    'or': lambda v: int(any(v)),
+    'xor': lambda v: v[0] ^ v[1],
+    'eq': lambda v: v[0] ^ v[1] ^ 1,
+    'imp': lambda v: (v[0] ^ 1) | v[1],
+}
+
+_BYTE_TO_DIGIT = bytes.maketrans(b'\x00\x01', b'01')
+
+
+class CompiledExpression:
+    """
+    Выражение, разобранное и скомпилированное один раз.
+    Подвыражения хранятся в собственном графе self.dag (self.root — корень): общий
+    на весь процесс граф рос бы без конца и не был бы безопасен для потоков.
+    function(_M, v0, v1, ...) принимает значения переменных в порядке self.variables.
+    """
+
+    def __init__(self, source):
+        self.source = source
+        self.tree = parse_expression(source)
+        self.dag = dag = ExpressionDag()
+        self.root = dag.add(self.tree)
+        self.variables = dag.variables(self.root)
+
+        namespace = {}
+        code = dag.source([self.root], self.variables)
+        exec(compile(code, "<expression>", "exec"), {"__builtins__": {}}, namespace)
+        self.function = namespace['_f']
+        # Кэш столбцов подвыражений: (порядок столбцов, {узел: маска})
+        self._columns = (None, {})
+
+    def evaluate(self, values):
+        """Значение выражения на одном наборе {переменная: 0/1}."""
+        return bool(self.function(1, *(int(bool(values[v])) for v in self.variables)))
+
+    def evaluate_bits(self, variables=None):
+        """
+        Вся таблица за один проход: бит i результата — значение на i-й строке.
+        variables — порядок столбцов, если таблица строится по более широкому
+        набору переменных (например, по объединению переменных двух выражений).
+        Столбцы подвыражений кэшируются, и повторный расчёт того же выражения
+        по тем же столбцам ничего не пересчитывает.
+        """
+        variables = tuple(self.variables if variables is None else variables)
+        key, cache = self._columns
+        if key != variables:
+            cache = {}
+        result = self.dag.evaluate_bits(self.root, variables, cache)
+        mask_bytes = (1 << len(variables)) // 8
+        if len(cache) * mask_bytes > COLUMN_CACHE_BYTES:
+            cache = {self.root: result}
+        self._columns = (variables, cache)
+        _COLUMN_BUDGET.charge(self, len(cache) * mask_bytes)
+        return result
+
+    def _drop_columns(self):
+        self._columns = (None, {})
+
+    def evaluate_gray(self):
+        """
+        Вся таблица без NumPy и без больших чисел: наборы перебираются в порядке
+        кода Грея, поэтому на каждом шаге меняется одна переменная и пересчитываются
+        только зависящие от неё узлы. Результат записывается сразу по стандартному
+        номеру строки и возвращается той же маской, что и evaluate_bits.
+        """
+        num_vars = len(self.variables)
+        order = self.dag.topological(self.root)
+        slot = {node: k for k, node in enumerate(order)}
+        root = slot[self.root]
+
+        depends = []
+        state = []
+        for node in order:
+            op, arg = self.dag.nodes[node]
+            if op == 'var':
+                depends.append({arg})
+                state.append(0)
+            elif op == 'const':
+                depends.append(set())
+                state.append(arg)
+            else:
+                depends.append(set().union(*(depends[slot[c]] for c in arg)))
+                state.append(_STEP_EVAL[op]([state[slot[c]] for c in arg]))
+
+        # Для каждой переменной — функция «перевернуть её и пересчитать зависимые узлы»
+        flips = []
+        for bit in range(num_vars):
+            var = self.variables[num_vars - 1 - bit]
+            lines = []
+            for k, node in enumerate(order):
+                if var not in depends[k]:
+                    continue
+                op, arg = self.dag.nodes[node]
+                if op == 'var':
+                    lines.append(f"    _s[{k}] ^= 1")
+                else:
+                    lines.append(f"    _s[{k}] = {_STEP_CODE[op]([slot[c] for c in arg])}")
+            lines.append(f"    return _s[{root}]")
+            namespace = {}
+            exec(compile("def _flip(_s):\n" + "\n".join(lines) + "\n", "<gray>", "exec"),
+                 {"__builtins__": {}}, namespace)
+            flips.append(namespace['_flip'])
+
+        total = 1 << num_vars
+        results = bytearray(total)
+        results[0] = state[root]
+        gray = 0
+        for step in range(1, total):
+            bit = (step & -step).bit_length() - 1
+            gray ^= 1 << bit
+            results[gray] = flips[bit](state)
+
+        # Байты 0/1 -> строка из '0'/'1' (старшие строки слева) -> маска
+        return int(results[::-1].translate(_BYTE_TO_DIGIT), 2)
+
+    def evaluate_block(self, prefix, low_vars):
+        """
+        Блок из 2^low_vars подряд идущих строк таблицы с номерами prefix * 2^low_vars + i.
+        Старшие переменные в блоке постоянны (0 или маска из единиц), младшие — обычные маски.
+        Возвращает число, бит i которого — результат i-й строки блока.
+        """
+        high_vars = len(self.variables) - low_vars
+        full = (1 << (1 << low_vars)) - 1
+        high = [full if (prefix >> (high_vars - 1 - j)) & 1 else 0 for j in range(high_vars)]
+        return self.function(full, *high, *variable_masks(low_vars))
+
+    def evaluate_columns(self, columns):
+        """Вычисление над целыми столбцами NumPy (по булеву массиву на переменную)."""
+        import numpy as np
+        total = len(columns[0]) if columns else 1
+        result = self.function(True, *columns)
+        # Константные подвыражения дают скаляр или целочисленный массив из 0/1
+        return np.broadcast_to(np.asarray(result).astype(bool), (total,))
+
+    def iter_results(self):
+        """Результаты по всем 2^n наборам в стандартном порядке (первая переменная — старший бит)."""
+        f = self.function
+        for bits in product((0, 1), repeat=len(self.variables)):
+            yield bits, f(1, *bits)
+
+
+@lru_cache(maxsize=256)
+def compile_expression(source):
+    """Кэшированная компиляция: повторные вызовы с той же строкой не разбирают её заново."""
+    return CompiledExpression(source)
+
+
+class CompiledOutputs:
+    """
+    Несколько выражений над общим набором переменных (объединением их переменных).
+    Общие подвыражения считаются один раз на все выражения: и в сгенерированной
+    функции с несколькими корнями, и в общем кэше столбцов.
+    """
+
+    def __init__(self, sources):
+        self.sources = tuple(sources)
+        # Все выражения — в одном графе, чтобы общие подвыражения стали общими узлами
+        self.dag = ExpressionDag()
+        self.roots = [self.dag.add(parse_expression(source)) for source in self.sources]
+        self.variables = sorted(set().union(*(self.dag.variables(root) for root in self.roots)))
+
+        namespace = {}
+        code = self.dag.source(self.roots, self.variables)
+        exec(compile(code, "<expressions>", "exec"), {"__builtins__": {}}, namespace)
+        function = namespace['_f']
+        self.function = function if len(self.roots) > 1 else lambda *args: (function(*args),)
+        self._columns = {}
+
+    def evaluate_bits(self):
+        """Маски таблиц всех выражений (бит i — строка i) с общим кэшем узлов."""
+        cache = self._columns
+        masks = [self.dag.evaluate_bits(root, self.variables, cache) for root in self.roots]
+        mask_bytes = (1 << len(self.variables)) // 8
+        if len(cache) * mask_bytes > COLUMN_CACHE_BYTES:
+            self._columns = cache = dict(zip(self.roots, masks))
+        _COLUMN_BUDGET.charge(self, len(cache) * mask_bytes)
+        return masks
+
+    def _drop_columns(self):
+        self._columns = {}
+
+    def evaluate_columns(self, columns):
+        """Столбцы результатов всех выражений по общим столбцам переменных NumPy."""
+        import numpy as np
+        total = len(columns[0]) if columns else 1
+        return [np.broadcast_to(np.asarray(result).astype(bool), (total,))
+                for result in self.function(True, *columns)]
+
+
+@lru_cache(maxsize=64)
+def compile_outputs(sources):
+    """Кэшированная компиляция кортежа выражений в CompiledOutputs."""
+    return CompiledOutputs(sources)
@@ -1,6 +1,142 @@
+import queue
+import threading
+import time
 import tkinter as tk
+from array import array
 from tkinter import ttk, messagebox
-from backend import TruthTableCalculator
+from backend import TruthTableCalculator, MIN_EGE_VARS, MAX_EGE_VARS
+from tables import BitTable
+
+# Период опроса фонового расчёта, мс
+POLL_INTERVAL_MS = 100
+# Пауза после нажатия клавиши перед пересчётом «на лету» и предел переменных для него
+LIVE_DELAY_MS = 300
+LIVE_MAX_VARS = 20
+
+
+class CalculationWorker(threading.Thread):
+    """
+    Расчёт таблицы истинности в фоновом потоке (как SolveWorker в lesson-7, но для tkinter).
+    Поток не трогает виджеты: события ('progress', готово, всего, маска),
+    ('finished', время), ('cancelled', текст) и ('error', текст) кладутся в очередь,
+    которую окно опрашивает через after().
+    """
+
+    def __init__(self, calculator, expression):
+        super().__init__(daemon=True)
+        self.calculator = calculator
+        self.expression = expression
+        self.events = queue.Queue()
+        self.variables = []
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+
+    def run(self):
+        try:
+            self.variables = self.calculator._extract_variables(self.expression)
+            t0 = time.perf_counter()
+            self.calculator.calculate(self.expression, mode='bits',
+                                      progress_cb=lambda done, total, mask: self.events.put(
+                                          ('progress', done, total, mask)),
+                                      cancel_cb=lambda: self._cancelled)
+            self.events.put(('finished', time.perf_counter() - t0))
+        except RuntimeError as e:
+            self.events.put(('cancelled' if self._cancelled else 'error', str(e)))
+        except Exception as e:
+            self.events.put(('error', str(e)))
+
+
+class VirtualTable(tk.Frame):
+    """
+    Таблица, в которой элементы Treeview создаются только для видимого окна строк.
+    Данные задаются последовательностью номеров строк (range или array) и функцией,
+    возвращающей значения строки по номеру; при прокрутке меняются только значения
+    уже созданных элементов.
+    """
+
+    def __init__(self, master, height=10):
+        super().__init__(master)
+        self.tree = ttk.Treeview(self, show="headings", height=height, selectmode="browse")
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self._on_scrollbar)
+        self.tree.pack(side="left", fill="both", expand=True)
+        self.scrollbar.pack(side="right", fill="y")
+
+        self.indices = range(0)
+        self.get_row = None
+        self.offset = 0
+        self.item_index = {}
+
+        self.tree.bind("<Configure>", lambda e: self.refresh())
+        self.tree.bind("<MouseWheel>", self._on_wheel)
+        self.tree.bind("<Button-4>", lambda e: self.scroll(-3) or "break")
+        self.tree.bind("<Button-5>", lambda e: self.scroll(3) or "break")
+        self.tree.bind("<Up>", lambda e: self.scroll(-1) or "break")
+        self.tree.bind("<Down>", lambda e: self.scroll(1) or "break")
+        self.tree.bind("<Prior>", lambda e: self.scroll(-self.visible_rows()) or "break")
+        self.tree.bind("<Next>", lambda e: self.scroll(self.visible_rows()) or "break")
+
+    def set_columns(self, columns):
+        self.tree['columns'] = columns
+        for col in columns:
+            self.tree.heading(col, text=col)
+            self.tree.column(col, width=80, anchor="center")
+
+    def set_source(self, indices, get_row, keep_offset=False):
+        self.indices = indices
+        self.get_row = get_row
+        if not keep_offset:
+            self.offset = 0
+        self.refresh()
+
+    def visible_rows(self):
+        row_height = int(ttk.Style().lookup("Treeview", "rowheight") or 20)
+        # Заголовок занимает примерно одну строку
+        return max(1, self.tree.winfo_height() // row_height - 1)
+
+    def scroll(self, delta):
+        self.offset += delta
+        self.refresh()
+
+    def row_index(self, item):
+        """Номер строки данных, показанной в элементе item (None, если элемент пуст)."""
+        return self.item_index.get(item)
+
+    def refresh(self):
+        total = len(self.indices)
+        visible = self.visible_rows()
+        self.offset = max(0, min(self.offset, total - visible))
+        count = min(visible, total - self.offset)
+
+        items = list(self.tree.get_children())
+        for item in items[count:]:
+            self.tree.delete(item)
+        while len(items) < count:
+            items.append(self.tree.insert("", "end"))
+
+        self.item_index = {}
+        for k in range(count):
+            index = self.indices[self.offset + k]
+            self.item_index[items[k]] = index
+            self.tree.item(items[k], values=self.get_row(index))
+
+        if total:
+            self.scrollbar.set(self.offset / total, (self.offset + count) / total)
+        else:
+            self.scrollbar.set(0, 1)
+
+    def _on_scrollbar(self, action, amount, unit=None):
+        if action == "moveto":
+            self.offset = int(float(amount) * len(self.indices))
+            self.refresh()
+        elif action == "scroll":
+            step = self.visible_rows() if unit == "pages" else 1
+            self.scroll(int(amount) * step)
+
+    def _on_wheel(self, event):
+        self.scroll(-3 if event.delta > 0 else 3)
+        return "break"
 
 
 class TruthTableApp:
@@ -13,6 +149,11 @@ class TruthTableApp:
         self.current_filter = 'all'
         self.edit_mode = False
         self.edited_results = None
+        self.worker = None
+        # Уже посчитанная часть таблицы во время фонового расчёта (до первого отчёта — снимок прежних строк)
+        self.partial_table = None
+        self.display_variables = []
+        self.live_job = None
 
         self.create_widgets()
 
@@ -40,6 +181,7 @@ class TruthTableApp:
         self.expression_entry = tk.Entry(input_frame, font=("Arial", 12))
         self.expression_entry.pack(fill="x", pady=5)
         self.expression_entry.bind("<Return>", lambda e: self.calculate())
+        self.expression_entry.bind("<KeyRelease>", self.schedule_live_recalculate)
 
         examples = ["(x and not y) or (y == z) or w", "x or y", "not w", "(x or y) and (not z)"]
         example_frame = tk.Frame(input_frame)
@@ -52,8 +194,16 @@ class TruthTableApp:
         control_frame = tk.Frame(self.normal_frame)
         control_frame.pack(pady=10)
 
-        tk.Button(control_frame, text="Вычислить", command=self.calculate,
-                  bg="#4CAF50", fg="white", font=("Arial", 11, "bold")).pack(side="left", padx=5)
+        self.calc_btn = tk.Button(control_frame, text="Вычислить", command=self.calculate,
+                                  bg="#4CAF50", fg="white", font=("Arial", 11, "bold"))
+        self.calc_btn.pack(side="left", padx=5)
+        self.cancel_btn = tk.Button(control_frame, text="Отмена", command=self.cancel_calculation,
+                                    state="disabled")
+        self.cancel_btn.pack(side="left", padx=5)
+
+        self.live_var = tk.BooleanVar()
+        tk.Checkbutton(control_frame, text="Пересчитывать при вводе",
+                       variable=self.live_var).pack(side="left", padx=10)
 
         self.edit_var = tk.BooleanVar()
         tk.Checkbutton(control_frame, text="Режим редактирования",
@@ -73,19 +223,16 @@ class TruthTableApp:
             tk.Button(filter_frame, text=text,
                       command=lambda f=filter_type: self.apply_filter(f)).pack(side="left", padx=2)
 
+        self.progress = ttk.Progressbar(self.normal_frame, mode="determinate", maximum=1)
+        self.progress.pack(padx=20, fill="x")
+
         table_frame = tk.Frame(self.normal_frame)
         table_frame.pack(pady=10, padx=20, fill="both", expand=True)
 
-        columns = ("w", "x", "y", "z", "Результат")
-        self.tree = ttk.Treeview(table_frame, columns=columns, show="headings", height=10)
-        for col in columns:
-            self.tree.heading(col, text=col)
-            self.tree.column(col, width=80, anchor="center")
-
-        scrollbar = ttk.Scrollbar(table_frame, orient="vertical", command=self.tree.yview)
-        self.tree.configure(yscrollcommand=scrollbar.set)
-        self.tree.pack(side="left", fill="both", expand=True)
-        scrollbar.pack(side="right", fill="y")
+        self.table = VirtualTable(table_frame, height=10)
+        self.table.set_columns(("w", "x", "y", "z", "Результат"))
+        self.table.pack(fill="both", expand=True)
+        self.tree = self.table.tree
         self.tree.bind("<Double-1>", self.edit_result)
         self.info_label = tk.Label(self.normal_frame, text="", fg="blue")
         self.info_label.pack(pady=5)
@@ -94,7 +241,7 @@ class TruthTableApp:
         tk.Label(self.ege_frame, text="Решатель задач ЕГЭ (задание 2)",
                  font=("Arial", 16, "bold")).pack(pady=10)
         instruction = tk.Label(self.ege_frame,
-                               text="Введите выражение (переменные x, y, z, w; синтаксис Python: and, or, not, ==).\n"
+                               text="Введите выражение (от 3 до 8 переменных; синтаксис Python: and, or, not, ==).\n"
                                     "Заполните неполную таблицу. Для неизвестных значений оставьте ячейку пустой.",
                                font=("Arial", 10))
         instruction.pack(pady=5)
@@ -114,9 +261,15 @@ class TruthTableApp:
         button_frame = tk.Frame(input_frame)
         button_frame.pack(fill="x", pady=10)
 
-        tk.Button(button_frame, text="Решить задачу",
-                  command=self.solve_ege_task,
-                  bg="#4CAF50", fg="white", font=("Arial", 11, "bold")).pack(side="left", padx=5)
+        self.ege_solve_btn = tk.Button(button_frame, text="Решить задачу",
+                                       command=self.solve_ege_task,
+                                       bg="#4CAF50", fg="white", font=("Arial", 11, "bold"))
+        self.ege_solve_btn.pack(side="left", padx=5)
+
+        tk.Label(button_frame, text="Переменных:").pack(side="left", padx=(15, 2))
+        self.ege_vars_var = tk.IntVar(value=4)
+        tk.Spinbox(button_frame, from_=MIN_EGE_VARS, to=MAX_EGE_VARS, width=3, state="readonly",
+                   textvariable=self.ege_vars_var, command=self.rebuild_ege_columns).pack(side="left")
 
         table_ege_frame = tk.Frame(self.ege_frame)
         table_ege_frame.pack(pady=10, padx=20, fill="both", expand=True)
@@ -126,11 +279,8 @@ class TruthTableApp:
         right_frame = tk.Frame(table_ege_frame)
         right_frame.pack(side="right", fill="both", expand=True)
         tk.Label(left_frame, text="Неполная таблица истинности:", font=("Arial", 12, "bold")).pack(anchor="w")
-        ege_columns = ("F1", "F2", "F3", "F4", "Результат")
-        self.ege_input_tree = ttk.Treeview(left_frame, columns=ege_columns, show="headings", height=8)
-        for col in ege_columns:
-            self.ege_input_tree.heading(col, text=col)
-            self.ege_input_tree.column(col, width=60, anchor="center")
+        self.ege_input_tree = ttk.Treeview(left_frame, show="headings", height=8)
+        self.rebuild_ege_columns()
         ege_input_scrollbar = ttk.Scrollbar(left_frame, orient="vertical", command=self.ege_input_tree.yview)
         self.ege_input_tree.configure(yscrollcommand=ege_input_scrollbar.set)
         self.ege_input_tree.pack(side="left", fill="both", expand=True)
@@ -153,6 +303,16 @@ class TruthTableApp:
         ege_results_scrollbar.pack(side="right", fill="y")
         self.ege_input_tree.bind("<Double-1>", self.edit_ege_cell)
 
+    def rebuild_ege_columns(self):
+        """Перестраивает столбцы неполной таблицы под выбранное число переменных."""
+        self.clear_ege_table()
+        num_vars = self.ege_vars_var.get()
+        ege_columns = [f"F{i + 1}" for i in range(num_vars)] + ["Результат"]
+        self.ege_input_tree['columns'] = ege_columns
+        for col in ege_columns:
+            self.ege_input_tree.heading(col, text=col)
+            self.ege_input_tree.column(col, width=60, anchor="center")
+
     def set_example(self, example):
         self.expression_entry.delete(0, tk.END)
         self.expression_entry.insert(0, example)
@@ -162,26 +322,25 @@ class TruthTableApp:
         self.ege_expression_entry.insert(0, example)
 
     def solve_ege_task(self):
+        # Калькулятор занят фоновым расчётом таблицы — не трогаем его из главного потока
+        if self.worker is not None:
+            return
         expression = self.ege_expression_entry.get().strip()
         if not expression:
             messagebox.showwarning("Внимание", "Введите выражение")
             return
 
+        num_vars = self.ege_vars_var.get()
         incomplete_table = []
         for item in self.ege_input_tree.get_children():
             values = self.ege_input_tree.item(item, "values")
-            if len(values) == 5:
+            if len(values) == num_vars + 1:
                 try:
-                    row = {
-                        'F1': int(values[0]) if values[0] else None,
-                        'F2': int(values[1]) if values[1] else None,
-                        'F3': int(values[2]) if values[2] else None,
-                        'F4': int(values[3]) if values[3] else None,
-                    }
-                    if not values[4]:
+                    row = {f'F{i + 1}': int(values[i]) if values[i] else None for i in range(num_vars)}
+                    if not values[num_vars]:
                         messagebox.showerror("Ошибка", "Значение в столбце 'Результат' не может быть пустым.")
                         return
-                    row['result'] = bool(int(values[4]))
+                    row['result'] = bool(int(values[num_vars]))
                     incomplete_table.append(row)
                 except (ValueError, IndexError):
                     messagebox.showerror("Ошибка", "Все значения в таблице должны быть 0, 1 или пустыми.")
@@ -207,7 +366,7 @@ class TruthTableApp:
             messagebox.showerror("Ошибка", str(e))
 
     def add_ege_row(self):
-        self.ege_input_tree.insert("", "end", values=("", "", "", "", "0"))
+        self.ege_input_tree.insert("", "end", values=("",) * self.ege_vars_var.get() + ("0",))
 
     def delete_ege_row(self):
         selection = self.ege_input_tree.selection()
@@ -228,8 +387,9 @@ class TruthTableApp:
         try:
             col_index = int(col_id_str.replace('#', '')) - 1
             values = list(self.ege_input_tree.item(item, "values"))
+            num_vars = len(values) - 1
 
-            if 0 <= col_index < 4:  # Столбцы переменных F1-F4
+            if 0 <= col_index < num_vars:  # Столбцы переменных F1..Fn
                 current_value = values[col_index]
                 if current_value == "0":
                     new_value = "1"
@@ -238,7 +398,7 @@ class TruthTableApp:
                 else:
                     new_value = "0"
                 values[col_index] = new_value
-            elif col_index == 4:  # Столбец результата
+            elif col_index == num_vars:  # Столбец результата
                 current_value = values[col_index]
                 new_value = "1" if current_value == "0" else "0"
                 values[col_index] = new_value
@@ -252,62 +412,150 @@ class TruthTableApp:
         if not expression:
             messagebox.showwarning("Внимание", "Введите выражение")
             return
+        if self.worker is not None:
+            return
+
+        # Упакованный режим в фоновом потоке: окно не замирает, строки появляются по мере расчёта.
+        # До первого отчёта о прогрессе показываем снимок прежних строк: калькулятор
+        # меняет поток, и окно не должно читать его, пока расчёт идёт
+        self.partial_table = self.source_results()
+        self.worker = CalculationWorker(self.calculator, expression)
+        self._set_busy(True)
+        self.worker.start()
+        self.root.after(POLL_INTERVAL_MS, self._poll_worker)
+
+    def schedule_live_recalculate(self, event=None):
+        if not self.live_var.get():
+            return
+        if self.live_job is not None:
+            self.root.after_cancel(self.live_job)
+        self.live_job = self.root.after(LIVE_DELAY_MS, self.live_recalculate)
+
+    def live_recalculate(self):
+        self.live_job = None
+        expression = self.expression_entry.get().strip()
+        if not expression or self.worker is not None or expression == self.calculator.expression:
+            return
         try:
-            self.calculator.calculate(expression)
-            self.edited_results = None
-            self.current_filter = 'all'
-            self.update_table()
-        except Exception as e:
-            messagebox.showerror("Ошибка", str(e))
+            if len(self.calculator._extract_variables(expression)) > LIVE_MAX_VARS:
+                return
+            # Пересчитываются только изменённые подвыражения, остальные берутся из кэша
+            self.calculator.recalculate(expression)
+        except Exception:
+            return  # выражение ещё не дописано — оставляем прежнюю таблицу
+        self.edited_results = None
+        self.update_table(keep_offset=True)
+
+    def cancel_calculation(self):
+        if self.worker is not None:
+            self.worker.cancel()
+            self.cancel_btn.config(state="disabled")
+
+    def _set_busy(self, busy):
+        self.calc_btn.config(state="disabled" if busy else "normal")
+        self.ege_solve_btn.config(state="disabled" if busy else "normal")
+        self.cancel_btn.config(state="normal" if busy else "disabled")
+        self.progress['value'] = 0
+
+    def _poll_worker(self):
+        worker = self.worker
+        latest = None
+        while True:
+            try:
+                event = worker.events.get_nowait()
+            except queue.Empty:
+                break
+            if event[0] == 'progress':
+                latest = event
+                continue
+
+            self.worker = None
+            self.partial_table = None
+            self._set_busy(False)
+            if event[0] == 'finished':
+                self.edited_results = None
+                self.current_filter = 'all'
+                self.update_table()
+            else:
+                self.update_table(keep_offset=True)
+                if event[0] == 'cancelled':
+                    self.info_label.config(text=event[1])
+                else:
+                    messagebox.showerror("Ошибка", event[1])
+            return
+
+        if latest is not None:
+            _, done, total, mask = latest
+            self.progress['value'] = done / total
+            # Показываем уже готовые строки, не дожидаясь конца расчёта
+            self.partial_table = BitTable(worker.variables, mask)
+            self.display_variables = worker.variables
+            self.table.set_columns(worker.variables + ['Результат'])
+            self.table.set_source(range(done), self.display_row, keep_offset=True)
+            self.info_label.config(text=f"Вычислено строк: {done} из {total}")
+        self.root.after(POLL_INTERVAL_MS, self._poll_worker)
 
     def apply_filter(self, filter_type):
+        if self.worker is not None:
+            return
         self.current_filter = filter_type
         self.update_table()
 
-    def update_table(self):
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-
-        source_results = self.edited_results if self.edited_results is not None else self.calculator.results
-        if self.current_filter == 'all':
-            results_to_show = source_results
-        elif self.current_filter == 'true':
-            results_to_show = [r for r in source_results if r['result']]
-        elif self.current_filter == 'false':
-            results_to_show = [r for r in source_results if not r['result']]
-        else:  # minority
-            true_count = sum(1 for r in source_results if r['result'])
-            false_count = len(source_results) - true_count
-            if true_count < false_count:
-                results_to_show = [r for r in source_results if r['result']]
-            elif false_count < true_count:
-                results_to_show = [r for r in source_results if not r['result']]
-            else:
-                results_to_show = source_results
-
+    def update_table(self, keep_offset=False):
         vars_to_display = self.calculator.variables
         if not vars_to_display: return
 
-        self.tree['columns'] = vars_to_display + ['Результат']
-        for col in self.tree['columns']:
-            self.tree.heading(col, text=col)
-            self.tree.column(col, width=80, anchor="center")
-
-        for result in results_to_show:
-            values_tuple = tuple(result.get(var, '') for var in vars_to_display) + (
-                "True" if result['result'] else "False",)
-            self.tree.insert("", "end", values=values_tuple)
-
+        self.display_variables = vars_to_display
+        self.table.set_columns(vars_to_display + ['Результат'])
+        self.table.set_source(self.filtered_indices(), self.display_row, keep_offset)
         self.update_info()
 
-    def update_info(self):
-        source_results = self.edited_results if self.edited_results is not None else self.calculator.results
-        if not source_results:
-            self.info_label.config(text="")
-            return
+    def source_results(self):
+        if self.partial_table is not None:
+            return self.partial_table
+        return self.edited_results if self.edited_results is not None else self.calculator.results
+
+    def display_row(self, index):
+        result = self.source_results()[index]
+        return tuple(result.get(var, '') for var in self.display_variables) + (
+            "True" if result['result'] else "False",)
 
-        true_count = sum(1 for r in source_results if r['result'])
+    def filtered_indices(self):
+        """Номера строк текущего фильтра: range для всех строк, иначе компактный массив."""
+        source_results = self.source_results()
         total = len(source_results)
+        if self.current_filter == 'all':
+            return range(total)
+
+        # Упакованная таблица (в том числе с правками) считает и перебирает строки по маске
+        table = source_results if isinstance(source_results, BitTable) else None
+        if table is not None:
+            true_count = table.count_true()
+        else:
+            true_count = sum(1 for r in source_results if r['result'])
+        if self.current_filter == 'true':
+            value = True
+        elif self.current_filter == 'false':
+            value = False
+        elif true_count * 2 == total:  # minority при равенстве — все строки
+            return range(total)
+        else:
+            value = true_count * 2 < total
+
+        typecode = 'L' if total <= 2 ** 32 else 'Q'
+        if table is not None:
+            return array(typecode, map(int, table.iter_indices(value)))
+        return array(typecode, (i for i, r in enumerate(source_results) if bool(r['result']) == value))
+
+    def update_info(self):
+        if self.edited_results is None:
+            stats = self.calculator.get_stats()
+            if not stats:
+                self.info_label.config(text="")
+                return
+            total, true_count = stats['total'], stats['true']
+        else:
+            total, true_count = self.edited_results.total, self.edited_results.count_true()
         false_count = total - true_count
 
         if true_count < false_count:
@@ -325,31 +573,29 @@ class TruthTableApp:
         self.restore_btn.config(state="normal" if self.edit_mode else "disabled")
         if not self.edit_mode:
             self.edited_results = None
-            self.update_table()
+            if self.worker is None:
+                self.update_table()
 
     def edit_result(self, event):
-        if not self.edit_mode or not self.calculator.results: return
+        if not self.edit_mode or self.worker is not None or self.calculator.table is None: return
         selection = self.tree.selection()
         if not selection: return
+        index = self.table.row_index(selection[0])
+        if index is None: return
 
-        if self.edited_results is None:
-            self.edited_results = [r.copy() for r in self.calculator.results]
-
-        selected_item_values = self.tree.item(selection[0], "values")
-
-        # Находим соответствующую строку в наших данных
-        for result in self.edited_results:
-            matches = True
-            for i, var in enumerate(self.calculator.variables):
-                if str(result.get(var, '')) != str(selected_item_values[i]):
-                    matches = False
-                    break
-            if matches:
-                result['result'] = not result['result']
-                break
-        self.update_table()
+        # Правки хранятся маской таблицы: строки не раскладываются в словари даже при 2^20 строк
+        edited = self.edited_results
+        if edited is None:
+            table = self.calculator.table
+            edited = BitTable(table.variables, int.from_bytes(table.packed(), 'little'))
+
+        # Элемент таблицы сразу знает номер строки — искать её по значениям не нужно
+        self.edited_results = BitTable(edited.variables, edited.mask ^ (1 << index))
+        self.update_table(keep_offset=True)
 
     def restore_expression(self):
+        if self.worker is not None:
+            return
         if self.edited_results is None:
             messagebox.showinfo("Инфо", "Нет изменений для восстановления")
             return
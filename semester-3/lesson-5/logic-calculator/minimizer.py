@@ -0,0 +1,266 @@
+"""Минимизация ДНФ для восстановления выражения по таблице истинности.
+
+Импликанта хранится парой битовых масок (value, care): care отмечает переменные,
+входящие в терм, value — их значения. Бит n-1-j соответствует j-й переменной,
+как и номер строки в стандартной таблице.
+"""
+from expression import variable_masks
+
+# До этого числа переменных используется точный метод Куайна — Мак-Класки
+EXACT_MAX_VARS = 8
+# Ограничение на число произведений в методе Петрика, дальше — жадное покрытие
+PETRICK_MAX_TERMS = 2000
+
+
+def _literal_count(implicant):
+    return bin(implicant[1]).count('1')
+
+
+def _covers(implicant, minterm):
+    value, care = implicant
+    return minterm & care == value
+
+
+# ----------------------------- Куайн — Мак-Класки -----------------------------
+
+def prime_implicants(minterms, num_vars):
+    """Все простые импликанты: склеиваем пары, отличающиеся одной переменной."""
+    full = (1 << num_vars) - 1
+    current = {(m, full) for m in minterms}
+    primes = set()
+    while current:
+        merged = set()
+        used = set()
+        for value, care in current:
+            bits = care & ~value
+            while bits:
+                bit = bits & -bits
+                bits ^= bit
+                partner = (value | bit, care)
+                if partner in current:
+                    merged.add((value, care & ~bit))
+                    used.add((value, care))
+                    used.add(partner)
+        primes |= current - used
+        current = merged
+    return sorted(primes, key=lambda p: (_literal_count(p), p))
+
+
+def _petrick(uncovered, candidates):
+    """Точный выбор минимального покрытия методом Петрика (наборы — битовые маски)."""
+    products = {0}
+    for m in uncovered:
+        clause = [i for i, p in enumerate(candidates) if _covers(p, m)]
+        new_products = set()
+        for product in products:
+            for i in clause:
+                new_products.add(product | (1 << i))
+        # Поглощение: оставляем только минимальные по включению наборы
+        ordered = sorted(new_products, key=lambda x: bin(x).count('1'))
+        products = set()
+        kept = []
+        for x in ordered:
+            if not any(k & x == k for k in kept):
+                kept.append(x)
+                products.add(x)
+        if len(products) > PETRICK_MAX_TERMS:
+            return None
+
+    def cost(product):
+        chosen = [candidates[i] for i in range(len(candidates)) if product >> i & 1]
+        return len(chosen), sum(_literal_count(p) for p in chosen)
+
+    best = min(products, key=cost)
+    return [candidates[i] for i in range(len(candidates)) if best >> i & 1]
+
+
+def _greedy_cover(uncovered, candidates):
+    chosen = []
+    uncovered = set(uncovered)
+    while uncovered:
+        best = max(candidates, key=lambda p: (sum(1 for m in uncovered if _covers(p, m)), -_literal_count(p)))
+        chosen.append(best)
+        uncovered = {m for m in uncovered if not _covers(best, m)}
+    return chosen
+
+
+def minimize_exact(minterms, num_vars):
+    """Куайн — Мак-Класки: существенные импликанты, затем метод Петрика для остатка."""
+    primes = prime_implicants(minterms, num_vars)
+    chosen = []
+    uncovered = set(minterms)
+
+    # Существенные импликанты — единственные, покрывающие какой-то минтерм
+    for m in minterms:
+        covering = [p for p in primes if _covers(p, m)]
+        if len(covering) == 1 and covering[0] not in chosen:
+            chosen.append(covering[0])
+    for p in chosen:
+        uncovered = {m for m in uncovered if not _covers(p, m)}
+
+    if uncovered:
+        candidates = [p for p in primes if p not in chosen and any(_covers(p, m) for m in uncovered)]
+        rest = _petrick(sorted(uncovered), candidates)
+        if rest is None:
+            rest = _greedy_cover(uncovered, candidates)
+        chosen.extend(rest)
+    return chosen
+
+
+# ------------------------------ Эвристика Espresso ------------------------------
+
+class _CubeSpace:
+    """Кубы как маски строк таблицы (2^n бит) для быстрых проверок покрытия."""
+
+    def __init__(self, num_vars):
+        self.num_vars = num_vars
+        self.full = (1 << (1 << num_vars)) - 1
+        self.masks = variable_masks(num_vars)
+
+    def rows(self, implicant):
+        value, care = implicant
+        rows = self.full
+        for j, mask in enumerate(self.masks):
+            bit = 1 << (self.num_vars - 1 - j)
+            if care & bit:
+                rows &= mask if value & bit else self.full ^ mask
+        return rows
+
+    def supercube(self, rows):
+        """Наименьший куб, содержащий все строки rows."""
+        value = care = 0
+        for j, mask in enumerate(self.masks):
+            bit = 1 << (self.num_vars - 1 - j)
+            if not rows & mask:
+                care |= bit
+            elif not rows & (self.full ^ mask):
+                care |= bit
+                value |= bit
+        return value, care
+
+
+def _expand(space, cube, off_set, on_set):
+    """Расширяем куб, снимая литералы, пока он не задевает нулевые строки."""
+    value, care = cube
+    # Сначала пробуем литералы, снятие которых захватывает больше единиц
+    bits = [1 << k for k in range(space.num_vars) if care >> k & 1]
+    bits.sort(key=lambda b: -bin(space.rows((value & ~b, care & ~b)) & on_set).count('1'))
+    for bit in bits:
+        candidate = (value & ~bit, care & ~bit)
+        if not space.rows(candidate) & off_set:
+            value, care = candidate
+    return value, care
+
+
+def _suffix_unions(rows):
+    """suffix[i] — объединение rows[i:]; один проход вместо объединения «всех, кроме i» для каждого i."""
+    suffix = [0] * (len(rows) + 1)
+    for i in range(len(rows) - 1, -1, -1):
+        suffix[i] = suffix[i + 1] | rows[i]
+    return suffix
+
+
+def _irredundant(space, cover):
+    """Удаляем кубы, полностью покрытые остальными (начиная с самых мелких)."""
+    cover = sorted(cover, key=lambda c: -_literal_count(c))
+    rows = [space.rows(c) for c in cover]
+    # Остальные кубы для i-го — оставленные до него и все следующие (их ещё не проверяли)
+    after = _suffix_unions(rows)
+    before = 0
+    kept = []
+    for i, cube in enumerate(cover):
+        if rows[i] & ~(before | after[i + 1]):
+            kept.append(cube)
+            before |= rows[i]
+    return kept
+
+
+def _reduce(space, cover, on_set):
+    """
+    Сжимаем кубы по очереди до наименьших, покрывающих только их собственные единицы.
+    Каждый куб сравнивается с уже сжатыми предыдущими и ещё не сжатыми следующими:
+    если сжимать все кубы разом, единица, покрытая двумя кубами, выпадает из обоих.
+    Куб, все единицы которого покрыты остальными, выбрасывается.
+    """
+    rows = [space.rows(c) for c in cover]
+    after = _suffix_unions(rows)
+    before = 0
+    reduced = []
+    for i in range(len(cover)):
+        own = rows[i] & on_set & ~(before | after[i + 1])
+        if own:
+            cube = space.supercube(own)
+            reduced.append(cube)
+            before |= space.rows(cube)
+    return reduced
+
+
+def _covers_on_set(space, cover, on_set):
+    rows = 0
+    for cube in cover:
+        rows |= space.rows(cube)
+    return rows & on_set == on_set
+
+
+def _cost(cover):
+    return len(cover), sum(_literal_count(c) for c in cover)
+
+
+def minimize_heuristic(minterms, num_vars):
+    """Цикл EXPAND / IRREDUNDANT / REDUCE в духе Espresso над масками строк."""
+    space = _CubeSpace(num_vars)
+    on_set = 0
+    for m in minterms:
+        on_set |= 1 << m
+    off_set = space.full ^ on_set
+    all_vars = (1 << num_vars) - 1
+
+    cover = []
+    covered = 0
+    for m in minterms:
+        if covered >> m & 1:
+            continue
+        cube = _expand(space, (m, all_vars), off_set, on_set & ~covered)
+        cover.append(cube)
+        covered |= space.rows(cube)
+    cover = _irredundant(space, cover)
+
+    best = cover
+    while True:
+        cover = _reduce(space, cover, on_set)
+        cover = [_expand(space, c, off_set, on_set) for c in cover]
+        cover = _irredundant(space, list(dict.fromkeys(cover)))
+        # Итерация, потерявшая хоть одну единицу, не принимается, даже если она дешевле
+        if not _covers_on_set(space, cover, on_set) or _cost(cover) >= _cost(best):
+            return best
+        best = cover
+
+
+# ---------------------------------- Интерфейс ----------------------------------
+
+def minimize(minterms, num_vars):
+    """Минимальная (или близкая к ней) ДНФ по списку номеров единичных строк."""
+    minterms = sorted(set(minterms))
+    if not minterms:
+        return []
+    if num_vars <= EXACT_MAX_VARS:
+        return minimize_exact(minterms, num_vars)
+    return minimize_heuristic(minterms, num_vars)
+
+
+def format_dnf(variables, implicants):
+    """Запись ДНФ в синтаксисе Python: (x and not y) or z."""
+    n = len(variables)
+    if not implicants:
+        return "False"
+    terms = []
+    for value, care in sorted(implicants, key=lambda c: (-c[1], c[0])):
+        parts = []
+        for j, var in enumerate(variables):
+            bit = 1 << (n - 1 - j)
+            if care & bit:
+                parts.append(var if value & bit else f"not {var}")
+        if not parts:
+            return "True"
+        terms.append(parts[0] if len(parts) == 1 else f"({' and '.join(parts)})")
+    return " or ".join(terms)
@@ -0,0 +1,301 @@
+"""SAT-режим для выражений, таблицу которых построить невозможно.
+
+Выражение переводится в КНФ преобразованием Цейтина, а КНФ решается CDCL-решателем
+с двумя наблюдаемыми литералами, выучиванием дизъюнктов по первой точке
+единственности (1UIP), нехронологическим откатом и перезапусками.
+Литералы — ненулевые целые числа в стиле DIMACS: v — истина, -v — ложь.
+"""
+from functools import lru_cache
+
+from expression import compile_expression
+
+
+class CNF:
+    """
+    КНФ выражения. Переменные выражения получают номера 1..n в порядке
+    self.variables, вспомогательные переменные Цейтина — следующие номера.
+    root — литерал, равный значению всего выражения (сам по себе не утверждается).
+    """
+
+    def __init__(self, variables):
+        self.variables = list(variables)
+        self.ids = {var: i + 1 for i, var in enumerate(self.variables)}
+        self.num_vars = len(self.variables)
+        self.clauses = []
+        self.root = None
+        self._true = None
+
+    def new_var(self):
+        self.num_vars += 1
+        return self.num_vars
+
+    def _constant(self, value):
+        if self._true is None:
+            self._true = self.new_var()
+            self.clauses.append([self._true])
+        return self._true if value else -self._true
+
+    def encode(self, dag, root):
+        """
+        Литерал, эквивалентный узлу root графа подвыражений. Для каждой операции
+        добавляются дизъюнкты Цейтина; общие подвыражения кодируются один раз.
+        """
+        lits = {}
+        for node in dag.topological(root):
+            op, arg = dag.nodes[node]
+            if op == 'var':
+                lits[node] = self.ids[arg]
+                continue
+            if op == 'const':
+                lits[node] = self._constant(arg)
+                continue
+            args = [lits[c] for c in arg]
+            if op == 'not':
+                lits[node] = -args[0]
+                continue
+
+            out = self.new_var()
+            if op == 'and':
+                for a in args:
+                    self.clauses.append([-out, a])
+                self.clauses.append([out] + [-a for a in args])
+            elif op == 'or':
+                for a in args:
+                    self.clauses.append([out, -a])
+                self.clauses.append([-out] + args)
+            elif op in ('xor', 'eq'):
+                a, b = args
+                if op == 'eq':
+                    b = -b
+                self.clauses += [[-out, a, b], [-out, -a, -b], [out, -a, b], [out, a, -b]]
+            elif op == 'imp':
+                a, b = args
+                self.clauses += [[-out, -a, b], [out, a], [out, -b]]
+            else:
+                raise ValueError(f"Неизвестная операция: {op}")
+            lits[node] = out
+        return lits[root]
+
+
+@lru_cache(maxsize=64)
+def expression_cnf(source):
+    """Кэшированное преобразование выражения в КНФ."""
+    compiled = compile_expression(source)
+    cnf = CNF(compiled.variables)
+    cnf.root = cnf.encode(compiled.dag, compiled.root)
+    return cnf
+
+
+class CDCLSolver:
+    """Решатель выполнимости КНФ (CDCL). Дизъюнкты можно добавлять между вызовами solve."""
+
+    def __init__(self, num_vars, clauses=()):
+        self.num_vars = num_vars
+        self.clauses = []
+        self.watches = {}
+        self.assign = [0] * (num_vars + 1)  # 0 — не назначена, 1 — истина, -1 — ложь
+        self.level = [0] * (num_vars + 1)
+        self.reason = [None] * (num_vars + 1)
+        self.phase = [-1] * (num_vars + 1)
+        self.activity = [0.0] * (num_vars + 1)
+        self.bump = 1.0
+        self.trail = []
+        self.trail_lim = []
+        self.qhead = 0
+        self.ok = True
+        self.model = None
+        for clause in clauses:
+            self.add_clause(clause)
+
+    def value(self, lit):
+        v = self.assign[abs(lit)]
+        return v if lit > 0 else -v
+
+    def _watch(self, lit, ci):
+        self.watches.setdefault(lit, []).append(ci)
+
+    def _enqueue(self, lit, reason):
+        v = abs(lit)
+        self.assign[v] = 1 if lit > 0 else -1
+        self.level[v] = len(self.trail_lim)
+        self.reason[v] = reason
+        self.trail.append(lit)
+
+    def add_clause(self, clause):
+        """Добавляет дизъюнкт на нулевом уровне; возвращает False, если КНФ стала невыполнимой."""
+        self._backtrack(0)
+        if not self.ok:
+            return False
+        lits = []
+        for lit in dict.fromkeys(clause):
+            if -lit in lits or self.value(lit) == 1:
+                return True  # тавтология или уже выполнен
+            if self.value(lit) == 0:
+                lits.append(lit)
+        if not lits:
+            self.ok = False
+        elif len(lits) == 1:
+            self._enqueue(lits[0], None)
+            self.ok = self._propagate() is None
+        else:
+            ci = len(self.clauses)
+            self.clauses.append(lits)
+            self._watch(lits[0], ci)
+            self._watch(lits[1], ci)
+        return self.ok
+
+    def _propagate(self):
+        """Распространение единичных дизъюнктов; возвращает номер конфликтного дизъюнкта или None."""
+        while self.qhead < len(self.trail):
+            false_lit = -self.trail[self.qhead]
+            self.qhead += 1
+            watchers = self.watches.get(false_lit, [])
+            kept = []
+            self.watches[false_lit] = kept
+            i = 0
+            while i < len(watchers):
+                ci = watchers[i]
+                i += 1
+                clause = self.clauses[ci]
+                if clause[0] == false_lit:
+                    clause[0], clause[1] = clause[1], clause[0]
+                if self.value(clause[0]) == 1:
+                    kept.append(ci)
+                    continue
+                for k in range(2, len(clause)):
+                    if self.value(clause[k]) != -1:
+                        clause[1], clause[k] = clause[k], clause[1]
+                        self._watch(clause[1], ci)
+                        break
+                else:
+                    kept.append(ci)
+                    if self.value(clause[0]) == -1:
+                        kept.extend(watchers[i:])
+                        return ci
+                    self._enqueue(clause[0], ci)
+        return None
+
+    def _analyze(self, conflict):
+        """Выучиваемый дизъюнкт по первой точке единственности и уровень отката."""
+        current = len(self.trail_lim)
+        learnt = [0]
+        seen = set()
+        counter = 0
+        p = None
+        index = len(self.trail) - 1
+        clause = self.clauses[conflict]
+        while True:
+            for q in clause:
+                v = abs(q)
+                if q == p or v in seen or self.level[v] == 0:
+                    continue
+                seen.add(v)
+                self.activity[v] += self.bump
+                if self.level[v] == current:
+                    counter += 1
+                else:
+                    learnt.append(q)
+            while abs(self.trail[index]) not in seen:
+                index -= 1
+            p = self.trail[index]
+            index -= 1
+            counter -= 1
+            if counter == 0:
+                break
+            clause = self.clauses[self.reason[abs(p)]]
+        learnt[0] = -p
+
+        self.bump *= 1.05
+        if self.bump > 1e100:
+            self.activity = [a * 1e-100 for a in self.activity]
+            self.bump *= 1e-100
+
+        if len(learnt) == 1:
+            return learnt, 0
+        # Второй наблюдаемый литерал — с самого глубокого из оставшихся уровней
+        best = max(range(1, len(learnt)), key=lambda k: self.level[abs(learnt[k])])
+        learnt[1], learnt[best] = learnt[best], learnt[1]
+        return learnt, self.level[abs(learnt[1])]
+
+    def _backtrack(self, level):
+        if len(self.trail_lim) <= level:
+            return
+        start = self.trail_lim[level]
+        for lit in self.trail[start:]:
+            v = abs(lit)
+            self.phase[v] = self.assign[v]
+            self.assign[v] = 0
+            self.reason[v] = None
+        del self.trail[start:]
+        del self.trail_lim[level:]
+        self.qhead = len(self.trail)
+
+    def _pick_branch(self):
+        best, best_activity = 0, -1.0
+        for v in range(1, self.num_vars + 1):
+            if self.assign[v] == 0 and self.activity[v] > best_activity:
+                best, best_activity = v, self.activity[v]
+        return best * self.phase[best] if best else 0
+
+    def solve(self, assumptions=(), max_conflicts=None):
+        """
+        True — выполнима (набор в self.model), False — невыполнима при данных
+        предположениях, None — исчерпан лимит конфликтов max_conflicts.
+        """
+        self.model = None
+        self._backtrack(0)
+        if not self.ok or self._propagate() is not None:
+            self.ok = False
+            return False
+
+        assumptions = list(assumptions)
+        conflicts = 0
+        restart_limit = 100
+        since_restart = 0
+        while True:
+            conflict = self._propagate()
+            if conflict is not None:
+                conflicts += 1
+                since_restart += 1
+                if not self.trail_lim:
+                    self.ok = False
+                    return False
+                learnt, back_level = self._analyze(conflict)
+                self._backtrack(back_level)
+                if len(learnt) == 1:
+                    self._enqueue(learnt[0], None)
+                else:
+                    ci = len(self.clauses)
+                    self.clauses.append(learnt)
+                    self._watch(learnt[0], ci)
+                    self._watch(learnt[1], ci)
+                    self._enqueue(learnt[0], ci)
+                if max_conflicts is not None and conflicts >= max_conflicts:
+                    self._backtrack(0)
+                    return None
+                continue
+
+            if since_restart >= restart_limit:
+                since_restart = 0
+                restart_limit = int(restart_limit * 1.5)
+                self._backtrack(0)
+                continue
+
+            # Сначала предположения — каждое на своём уровне, затем обычные решения
+            if len(self.trail_lim) < len(assumptions):
+                lit = assumptions[len(self.trail_lim)]
+                if self.value(lit) == -1:
+                    self._backtrack(0)
+                    return False
+                self.trail_lim.append(len(self.trail))
+                if self.value(lit) == 0:
+                    self._enqueue(lit, None)
+                continue
+
+            lit = self._pick_branch()
+            if not lit:
+                self.model = list(self.assign)
+                self._backtrack(0)
+                return True
+            self.trail_lim.append(len(self.trail))
+            self._enqueue(lit, None)
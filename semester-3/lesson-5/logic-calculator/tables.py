@@ -0,0 +1,320 @@
+"""Компактные хранилища результатов TruthTableCalculator.
+
+Строки таблицы не хранятся списком словарей, а восстанавливаются по номеру,
+поэтому память не зависит от того, сколько строк реально показано.
+"""
+import json
+import mmap
+import struct
+
+try:
+    import numpy as np
+except ImportError:  # NumPy нужен только для ColumnTable
+    np = None
+
+# Номера единичных битов для каждого значения байта
+_BYTE_BITS = [tuple(b for b in range(8) if value >> b & 1) for value in range(256)]
+
+# Упакованный файл таблицы: сигнатура, длина заголовка (4 байта, little-endian),
+# заголовок JSON {"variables": [...], "expression": "..."} и вектор результатов,
+# в котором бит i (младший бит байта i // 8 — первый) — результат строки i
+PACKED_MAGIC = b"TTBL1\n"
+# Больше 2^32 строк (512 МБ) в файл не выгружаем
+PACKED_MAX_VARS = 32
+# Размер куска при подсчёте и переборе по отображённому файлу
+MAPPED_CHUNK_BYTES = 1 << 20
+
+
+def decode_row(variables, index, result):
+    """Строка таблицы в привычном виде {переменная: 0/1, 'result': bool}."""
+    n = len(variables)
+    row = {var: (index >> (n - 1 - j)) & 1 for j, var in enumerate(variables)}
+    row['result'] = bool(result)
+    return row
+
+
+def iter_set_bits(mask, total, invert=False):
+    """Номера единичных (или нулевых при invert=True) битов маски по возрастанию."""
+    data = mask.to_bytes((total + 7) // 8, 'little')
+    flip = 0xFF if invert else 0
+    for byte_index, value in enumerate(data):
+        value ^= flip
+        if not value:
+            continue
+        base = byte_index * 8
+        for bit in _BYTE_BITS[value]:
+            index = base + bit
+            if index >= total:
+                return
+            yield index
+
+
+class FilteredRows:
+    """Ленивое представление отфильтрованных строк: строки декодируются при обходе."""
+
+    def __init__(self, table, value):
+        self.table = table
+        self.value = value
+
+    def __len__(self):
+        true_count = self.table.count_true()
+        return true_count if self.value else self.table.total - true_count
+
+    def __iter__(self):
+        table = self.table
+        for index in self.indices():
+            yield table[int(index)]
+
+    def indices(self):
+        return self.table.iter_indices(self.value)
+
+
+class BitTable:
+    """Таблица истинности, упакованная в одно целое число: бит i — результат строки i."""
+
+    def __init__(self, variables, mask):
+        self.variables = list(variables)
+        self.mask = mask
+        self.total = 1 << len(self.variables)
+        self._true_count = None
+
+    def __len__(self):
+        return self.total
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.total
+        if not 0 <= index < self.total:
+            raise IndexError("Номер строки вне таблицы")
+        return decode_row(self.variables, index, self.result(index))
+
+    def __iter__(self):
+        for index in range(self.total):
+            yield self[index]
+
+    def result(self, index):
+        return (self.mask >> index) & 1
+
+    def count_true(self):
+        if self._true_count is None:
+            self._true_count = bin(self.mask).count('1')
+        return self._true_count
+
+    def iter_indices(self, value):
+        return iter_set_bits(self.mask, self.total, invert=not value)
+
+    def packed(self):
+        """Результаты упакованными байтами: бит i — строка i (формат save_packed)."""
+        return self.mask.to_bytes((self.total + 7) // 8, 'little')
+
+    def filtered(self, filter_type):
+        """Представление строк для фильтров 'all', 'true', 'false', 'minority'."""
+        if filter_type == 'true':
+            return FilteredRows(self, True)
+        if filter_type == 'false':
+            return FilteredRows(self, False)
+        if filter_type == 'minority':
+            true_count = self.count_true()
+            false_count = self.total - true_count
+            if true_count < false_count:
+                return FilteredRows(self, True)
+            if false_count < true_count:
+                return FilteredRows(self, False)
+        return self
+
+
+class ColumnTable(BitTable):
+    """
+    Таблица в столбцовом виде на NumPy: по массиву на переменную и массив результата.
+    Фильтры возвращают представления по булевой маске, а не копии словарей.
+    """
+
+    def __init__(self, variables, columns, result):
+        self.variables = list(variables)
+        self.columns = columns
+        self.result_column = result
+        self.total = len(result)
+        self._true_count = None
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.total
+        if not 0 <= index < self.total:
+            raise IndexError("Номер строки вне таблицы")
+        row = {var: int(self.columns[var][index]) for var in self.variables}
+        row['result'] = bool(self.result_column[index])
+        return row
+
+    def result(self, index):
+        return int(self.result_column[index])
+
+    def count_true(self):
+        if self._true_count is None:
+            self._true_count = int(np.count_nonzero(self.result_column))
+        return self._true_count
+
+    def iter_indices(self, value):
+        return np.flatnonzero(self.result_column if value else ~self.result_column)
+
+    def packed(self):
+        return np.packbits(self.result_column, bitorder='little').tobytes()
+
+
+def column_mask(column):
+    """Булев столбец NumPy -> маска-число в формате BitTable (бит i — строка i)."""
+    return int.from_bytes(np.packbits(column, bitorder='little').tobytes(), 'little')
+
+
+class MultiTable(BitTable):
+    """
+    Таблицы нескольких выражений над общими переменными: маска на каждое выражение.
+    Строка содержит 'result' первого выражения и кортеж 'results' всех выражений;
+    фильтры и статистика относятся к первому выражению, остальные доступны через output(k).
+    """
+
+    def __init__(self, variables, expressions, masks):
+        super().__init__(variables, masks[0])
+        self.expressions = list(expressions)
+        self.masks = list(masks)
+
+    def __getitem__(self, index):
+        row = super().__getitem__(index)
+        if index < 0:
+            index += self.total
+        row['results'] = tuple(bool((mask >> index) & 1) for mask in self.masks)
+        return row
+
+    def output(self, k):
+        """Таблица k-го выражения отдельно."""
+        return BitTable(self.variables, self.masks[k])
+
+
+class BddTable(BitTable):
+    """
+    Таблица, заданная диаграммой решений: ни одна строка не хранится,
+    число истинных строк считается по диаграмме, строки перечисляются лениво.
+    """
+
+    def __init__(self, variables, bdd, root):
+        self.variables = list(variables)
+        self.bdd = bdd
+        self.root = root
+        self.total = 1 << len(self.variables)
+        self._true_count = None
+
+    def result(self, index):
+        return self.bdd.evaluate(self.root, index)
+
+    def count_true(self):
+        if self._true_count is None:
+            self._true_count = self.bdd.sat_count(self.root)
+        return self._true_count
+
+    def iter_indices(self, value):
+        return self.bdd.iter_indices(self.root, value)
+
+    def packed(self):
+        if len(self.variables) > PACKED_MAX_VARS:
+            raise ValueError(f"Таблица больше чем из {PACKED_MAX_VARS} переменных не выгружается в файл")
+        data = bytearray((self.total + 7) // 8)
+        for index in self.iter_indices(True):
+            data[index >> 3] |= 1 << (index & 7)
+        return bytes(data)
+
+
+class MappedTable(BitTable):
+    """
+    Таблица из упакованного файла, отображённого в память (mmap): результат строки
+    читается одним байтом, подсчёт и фильтры идут кусками, файл целиком не читается.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # пустой файл mmap не отображает
+            self._file.close()
+            raise ValueError(f"Файл {path} не является таблицей истинности")
+        header, self.offset = _read_packed_header(self._map, path)
+        self.variables = list(header['variables'])
+        self.expression = header.get('expression', "")
+        self.total = 1 << len(self.variables)
+        self._true_count = None
+        if len(self._map) - self.offset < (self.total + 7) // 8:
+            self.close()
+            raise ValueError(f"Файл {path} обрезан: не хватает строк таблицы")
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def result(self, index):
+        return (self._map[self.offset + (index >> 3)] >> (index & 7)) & 1
+
+    def _chunks(self):
+        """Куски вектора результатов: (номер первой строки, целое с битами куска, строк в куске)."""
+        size = (self.total + 7) // 8
+        for start in range(0, size, MAPPED_CHUNK_BYTES):
+            data = self._map[self.offset + start:self.offset + min(size, start + MAPPED_CHUNK_BYTES)]
+            first = start * 8
+            yield first, int.from_bytes(data, 'little'), min(len(data) * 8, self.total - first)
+
+    def count_true(self):
+        if self._true_count is None:
+            self._true_count = sum(bin(bits).count('1') for _, bits, _ in self._chunks())
+        return self._true_count
+
+    def iter_indices(self, value):
+        for first, bits, rows in self._chunks():
+            for index in iter_set_bits(bits, rows, invert=not value):
+                yield first + index
+
+    def packed(self):
+        return self._map[self.offset:self.offset + (self.total + 7) // 8]
+
+
+def _read_packed_header(data, path):
+    """Заголовок упакованного файла и смещение вектора результатов."""
+    start = len(PACKED_MAGIC)
+    if data[:start] != PACKED_MAGIC:
+        raise ValueError(f"Файл {path} не является таблицей истинности")
+    (length,) = struct.unpack('<I', data[start:start + 4])
+    header = json.loads(bytes(data[start + 4:start + 4 + length]).decode('utf-8'))
+    return header, start + 4 + length
+
+
+def save_packed(path, variables, packed, expression=""):
+    """Записывает таблицу в упакованном формате (см. PACKED_MAGIC); packed — байты результатов."""
+    header = json.dumps({'variables': list(variables), 'expression': expression},
+                        ensure_ascii=False).encode('utf-8')
+    with open(path, 'wb') as f:
+        f.write(PACKED_MAGIC)
+        f.write(struct.pack('<I', len(header)))
+        f.write(header)
+        f.write(packed)
+
+
+def load_packed(path):
+    """Открывает упакованный файл как MappedTable (закрывается через close() или with)."""
+    return MappedTable(path)
+
+
+def assignment_columns(num_vars):
+    """
+    Все 2^n наборов как булева матрица (строка — набор, столбец — переменная),
+    полученная распаковкой битов np.arange в стандартном порядке.
+    """
+    if np is None:
+        raise RuntimeError("Для режима 'numpy' необходимо установить пакет numpy")
+    total = 1 << num_vars
+    width = next(size for size in (1, 2, 4, 8) if size * 8 >= num_vars)
+    numbers = np.arange(total, dtype=f'>u{width}').view(np.uint8).reshape(total, width)
+    bits = np.unpackbits(numbers, axis=1)[:, width * 8 - num_vars:]
+    return bits.view(bool)
@@ -0,0 +1,31 @@
+import random
+
+import pytest
+from backend import TruthTableCalculator
+from minimizer import format_dnf, minimize_heuristic
+from tables import BitTable
+
+
+def test_heuristic_keeps_every_minterm():
+    minterms = [1, 2, 3, 4, 5, 6, 7, 9, 10, 12, 15]
+    cover = minimize_heuristic(minterms, 4)
+    covered = {m for m in range(16) for value, care in cover if m & care == value}
+    assert covered == set(minterms)
+
+
+@pytest.mark.parametrize("num_vars", [9, 10, 11, 12])
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_restored_expression_is_equivalent(num_vars, seed):
+    rng = random.Random(seed * 100 + num_vars)
+    variables = [f"x{i}" for i in range(num_vars)]
+    minterms = [m for m in range(1 << num_vars) if rng.random() < 0.5]
+    mask = sum(1 << m for m in minterms)
+
+    calculator = TruthTableCalculator()
+    calculator.variables = variables
+    restored = calculator.create_expression_from_table(BitTable(variables, mask))
+
+    # Эталон — совершенная ДНФ исходной таблицы
+    full = (1 << num_vars) - 1
+    reference = format_dnf(variables, [(m, full) for m in minterms])
+    assert calculator.compare(reference, restored)['equivalent']
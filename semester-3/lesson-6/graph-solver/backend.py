@@ -1,16 +1,27 @@
 # backend.py
 import collections
 import re
-from typing import Dict, List, Tuple, Set
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Set
 
 
-def solve(matrix_str, edges_str, targets_str, is_weighted=True):
+# Способы получить номера пунктов для искомых вершин (ответ у всех одинаковый)
+STRATEGIES = ('orbits', 'witness', 'all')
+
+
+def solve(matrix_str, edges_str, targets_str, is_weighted=True, strategy='orbits'):
     """
     Основная функция-решатель.
     Теперь использует устойчивый парсинг и поиск изоморфизма (бэктрекинг),
     чтобы гарантированно находить корректное сопоставление или корректно объяснять ошибку.
+
+    strategy: 'orbits' — одно сопоставление и орбиты группы автоморфизмов,
+    'witness' — по одному подтверждающему сопоставлению на пару (вершина, номер),
+    'all' — перебор всех сопоставлений.
     """
     try:
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Неизвестный способ поиска '{strategy}', допустимы: {', '.join(STRATEGIES)}.")
+
         # Парсинг таблицы
         if is_weighted:
             table_adj, table_weights = _parse_matrix_weighted(matrix_str)
@@ -49,20 +60,19 @@ def solve(matrix_str, edges_str, targets_str, is_weighted=True):
                         f"Длины из графа: {sorted(graph_weights)}\n"
                         f"Длины из таблицы: {sorted(table_weights)}")
 
-        # Поиск изоморфизма(ов) между графом (буквы) и таблицей (номера)
-        # Получаем все допустимые сопоставления (может быть несколько)
-        mappings = _find_all_isomorphisms(graph_adj, table_adj, weighted=is_weighted)
+        # Поиск изоморфизма между графом (буквы) и таблицей (номера): по умолчанию одно
+        # сопоставление и орбиты искомых вершин в группе автоморфизмов
+        if strategy == 'orbits':
+            result_points = _target_points(graph_adj, table_adj, is_weighted, target_nodes)
+        elif strategy == 'witness':
+            result_points = _target_points_by_witness(graph_adj, table_adj, is_weighted, target_nodes)
+        else:
+            mappings = _find_all_isomorphisms(graph_adj, table_adj, weighted=is_weighted)
+            result_points = {mapping[t] for mapping in mappings for t in target_nodes} if mappings else None
 
-        if not mappings:
+        if result_points is None:
             return "Ошибка: Не удалось сопоставить граф с таблицей. Проверьте корректность входных данных."
 
-        # Собираем номера пунктов для искомых вершин из всех найденных сопоставлений
-        result_points: Set[int] = set()
-        for mapping in mappings:
-            for t in target_nodes:
-                if t in mapping:
-                    result_points.add(mapping[t])
-
         if not result_points:
             return "Ошибка: Искомые вершины не найдены в полученных соответствиях."
 
@@ -300,6 +310,166 @@ def _parse_edges_unweighted(edges_str: str) -> Tuple[Dict[str, Dict[str, int]],
 
 # -------------------------- Поиск изоморфизмов и ответ --------------------------
 
+def _colour_refinement(graph: Dict[str, Dict[str, int]],
+                       table: Dict[int, Dict[int, int]],
+                       weighted: bool) -> Optional[Tuple[Dict[str, int], Dict[int, int]]]:
+    """
+    Уточнение раскраски (алгоритм Вейсфейлера — Лемана, 1-WL) сразу для графа и таблицы.
+    На каждом шаге новый цвет вершины — её старый цвет и мультимножество пар
+    (цвет ребра, цвет соседа); цвет ребра — его вес во взвешенном режиме.
+    Номера цветов общие для обоих графов, поэтому вершина графа может перейти
+    только в вершину таблицы того же цвета.
+    Возвращает устойчивые раскраски или None, если гистограммы цветов разошлись
+    (это доказывает, что изоморфизма нет).
+    """
+    def signature(adj: Dict, colour: Dict, node):
+        neighbours = sorted((adj[node][n] if weighted else 1, colour[n]) for n in adj[node])
+        return colour[node], tuple(neighbours)
+
+    g_colour: Dict[str, int] = {u: 0 for u in graph}
+    t_colour: Dict[int, int] = {v: 0 for v in table}
+    classes = 1
+
+    while True:
+        g_sig = {u: signature(graph, g_colour, u) for u in graph}
+        t_sig = {v: signature(table, t_colour, v) for v in table}
+        palette = {sig: i for i, sig in enumerate(sorted(set(g_sig.values()) | set(t_sig.values())))}
+        g_colour = {u: palette[sig] for u, sig in g_sig.items()}
+        t_colour = {v: palette[sig] for v, sig in t_sig.items()}
+
+        if collections.Counter(g_colour.values()) != collections.Counter(t_colour.values()):
+            return None
+        if len(palette) == classes:
+            return g_colour, t_colour
+        classes = len(palette)
+
+
+def _candidate_domains(graph: Dict[str, Dict[str, int]],
+                       table: Dict[Any, Dict[Any, int]],
+                       weighted: bool) -> Optional[Dict[str, Set[Any]]]:
+    """
+    Начальные домены: для каждой вершины графа — номера таблицы того же цвета
+    устойчивой раскраски 1-WL. None, если гистограммы цветов различаются
+    (изоморфизма нет).
+    """
+    colours = _colour_refinement(graph, table, weighted)
+    if colours is None:
+        return None
+    g_colour, t_colour = colours
+
+    colour_to_table_nodes: Dict[int, List[Any]] = collections.defaultdict(list)
+    for v in table:
+        colour_to_table_nodes[t_colour[v]].append(v)
+    return {u: set(colour_to_table_nodes[g_colour[u]]) for u in graph}
+
+
+class _BitAdjacency:
+    """
+    Смежность в виде битовых масок: вершина nodes[i] — бит i. rows[i] — маска соседей,
+    layers[w][i] — маска соседей по рёбрам веса w (для взвешенного режима).
+    Строится по словарям смежности из _parse_matrix_weighted / _parse_edges_weighted.
+    """
+
+    def __init__(self, adj: Dict[Any, Dict[Any, int]]):
+        self.nodes = sorted(adj)
+        self.index = {node: i for i, node in enumerate(self.nodes)}
+        self.full = (1 << len(self.nodes)) - 1
+        self.rows: List[int] = [0] * len(self.nodes)
+        self.layers: Dict[int, List[int]] = collections.defaultdict(lambda: [0] * len(self.nodes))
+        for node, neighbours in adj.items():
+            i = self.index[node]
+            for other, w in neighbours.items():
+                bit = 1 << self.index[other]
+                self.rows[i] |= bit
+                self.layers[w][i] |= bit
+
+    def mask(self, nodes) -> int:
+        result = 0
+        for node in nodes:
+            result |= 1 << self.index[node]
+        return result
+
+    def members(self, mask: int) -> List[Any]:
+        """Вершины маски по возрастанию."""
+        result = []
+        while mask:
+            low = mask & -mask
+            result.append(self.nodes[low.bit_length() - 1])
+            mask ^= low
+        return result
+
+
+def _search_isomorphisms(graph: Dict[str, Dict[str, int]],
+                         table: _BitAdjacency,
+                         weighted: bool,
+                         domains: Dict[str, Set[Any]],
+                         fixed: Optional[Tuple[str, Any]] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Перебирает сопоставления graph -> table (по одному, лениво) бэктрекингом
+    с распространением ограничений (forward checking). Домены хранятся битовыми
+    масками вершин таблицы, так что сужение домена — одно побитовое И.
+    fixed — пара (u, v), назначаемая заранее. Вызывающий может остановиться
+    на первом найденном сопоставлении.
+    """
+    assignment: Dict[str, Any] = {}
+    empty_layer = [0] * len(table.nodes)
+
+    def propagate(domains: Dict[str, int], u: str, v: int) -> Optional[Dict[str, int]]:
+        """
+        Домены оставшихся вершин после назначения u -> v (v — номер бита): соседи u
+        могут перейти только в соседей v (с тем же весом), остальные — только
+        в не-соседей v. None, если какой-то домен опустел.
+        """
+        near = table.rows[v]
+        far = table.full & ~near & ~(1 << v)
+        reduced: Dict[str, int] = {}
+        for u2, domain in domains.items():
+            if u2 == u:
+                continue
+            w = graph[u].get(u2)
+            if w is None:
+                domain &= far
+            elif weighted:
+                domain &= table.layers.get(w, empty_layer)[v]
+            else:
+                domain &= near
+            if not domain:
+                return None
+            reduced[u2] = domain
+        return reduced
+
+    def backtrack(domains: Dict[str, int]):
+        if not domains:
+            yield dict(assignment)
+            return
+
+        # Следующая вершина — с наименьшим оставшимся доменом
+        u = min(domains, key=lambda x: (bin(domains[x]).count('1'), x))
+        bits = domains[u]
+        while bits:
+            low = bits & -bits
+            bits ^= low
+            v = low.bit_length() - 1
+            reduced = propagate(domains, u, v)
+            if reduced is None:
+                continue
+            assignment[u] = table.nodes[v]
+            yield from backtrack(reduced)
+            del assignment[u]
+
+    masks = {u: table.mask(domain) for u, domain in domains.items()}
+    if fixed is not None:
+        u, node = fixed
+        v = table.index[node]
+        if not masks[u] >> v & 1:
+            return
+        masks = propagate(masks, u, v)
+        if masks is None:
+            return
+        assignment[u] = node
+    yield from backtrack(masks)
+
+
 def _find_all_isomorphisms(graph: Dict[str, Dict[str, int]],
                            table: Dict[int, Dict[int, int]],
                            weighted: bool) -> List[Dict[str, int]]:
@@ -308,80 +478,83 @@ def _find_all_isomorphisms(graph: Dict[str, Dict[str, int]],
     согласованные по структуре (и по весам, если weighted=True).
     Возвращает список отображений.
     """
-    g_nodes = list(graph.keys())
-    t_nodes = list(table.keys())
-
-    # Предварительные признаки (сильные локальные сигнатуры)
-    g_deg = {u: len(graph[u]) for u in g_nodes}
-    t_deg = {v: len(table[v]) for v in t_nodes}
-
-    def node_signature(adj: Dict, degrees: Dict, node, include_weights: bool):
-        # Степень узла
-        deg = degrees[node]
-        # Многомножество степеней соседей
-        neigh_deg = sorted(degrees[n] for n in adj[node].keys())
-        if include_weights:
-            # Многомножество инцидентных весов
-            inc_w = sorted(adj[node][n] for n in adj[node].keys())
-            # Многомножество пар (вес, степень соседа)
-            w_deg_pairs = sorted((adj[node][n], degrees[n]) for n in adj[node].keys())
-            return (deg, tuple(neigh_deg), tuple(inc_w), tuple(w_deg_pairs))
-        else:
-            return (deg, tuple(neigh_deg))
-
-    g_sig = {u: node_signature(graph, g_deg, u, weighted) for u in g_nodes}
-    t_sig = {v: node_signature(table, t_deg, v, weighted) for v in t_nodes}
-
-    # Кандидаты: для каждой вершины графа — какие номера таблицы возможны по локальной сигнатуре
-    candidates: Dict[str, Set[int]] = {}
-    sig_to_table_nodes: Dict[Tuple, List[int]] = collections.defaultdict(list)
-    for v, sig in t_sig.items():
-        sig_to_table_nodes[sig].append(v)
-
-    for u in g_nodes:
-        cand = set(sig_to_table_nodes.get(g_sig[u], []))
-        if not cand:
-            # Если локально никто не подходит — изоморфизма нет
-            return []
-        candidates[u] = cand
-
-    # Бэктрекинг: назначаем вершины с наименьшим числом кандидатов
-    solutions: List[Dict[str, int]] = []
-
-    used_t: Set[int] = set()
-    assignment: Dict[str, int] = {}
-
-    # Порядок перебора: по возрастанию числа кандидатов
-    order = sorted(g_nodes, key=lambda x: (len(candidates[x]), x))
-
-    def consistent(u: str, v: int) -> bool:
-        # проверяем согласованность с уже назначенными соседями
-        for u2 in graph[u].keys():
-            if u2 in assignment:
-                v2 = assignment[u2]
-                # В таблице должен быть такой же тип связи
-                if v2 not in table[v]:
-                    return False
-                if weighted:
-                    if table[v][v2] != graph[u][u2]:
-                        return False
-        return True
-
-    def backtrack(idx: int):
-        if idx == len(order):
-            solutions.append(dict(assignment))
-            return
+    domains = _candidate_domains(graph, table, weighted)
+    if domains is None:
+        return []
+    return list(_search_isomorphisms(graph, _BitAdjacency(table), weighted, domains))
+
 
-        u = order[idx]
-        # оставшиеся кандидаты для u (без уже занятых)
-        cands = sorted(candidates[u] - used_t)
-        for v in cands:
-            if consistent(u, v):
-                assignment[u] = v
-                used_t.add(v)
-                backtrack(idx + 1)
-                used_t.remove(v)
-                del assignment[u]
-
-    backtrack(0)
-    return solutions
+def _target_points(graph: Dict[str, Dict[str, int]],
+                   table: Dict[int, Dict[int, int]],
+                   weighted: bool,
+                   target_nodes: List[str]) -> Optional[Set[int]]:
+    """
+    Номера пунктов, в которые могут перейти искомые вершины, без перебора всех
+    сопоставлений. Любое сопоставление — это φ∘σ, где φ — одно найденное
+    сопоставление, а σ — автоморфизм графа, поэтому ответ — образ при φ орбит
+    искомых вершин в группе автоморфизмов.
+    Орбиты собираются системой непересекающихся множеств: для каждой вершины u
+    того же цвета, что и искомая t, ищется один автоморфизм t -> u, и все его пары
+    объединяются (найденные автоморфизмы порождают группу). Если u уже в орбите t,
+    поиск не нужен. None — если сопоставления нет вовсе.
+    """
+    domains = _candidate_domains(graph, table, weighted)
+    if domains is None:
+        return None
+    mapping = next(_search_isomorphisms(graph, _BitAdjacency(table), weighted, domains), None)
+    if mapping is None:
+        return None
+
+    parent: Dict[str, str] = {u: u for u in graph}
+
+    def find(u: str) -> str:
+        while parent[u] != u:
+            parent[u] = parent[parent[u]]
+            u = parent[u]
+        return u
+
+    auto_domains = _candidate_domains(graph, graph, weighted)
+    graph_bits = _BitAdjacency(graph)
+    for t in target_nodes:
+        for u in sorted(auto_domains[t]):
+            if find(u) == find(t):
+                continue
+            sigma = next(_search_isomorphisms(graph, graph_bits, weighted, auto_domains, fixed=(t, u)), None)
+            if sigma is not None:
+                for x, y in sigma.items():
+                    parent[find(x)] = find(y)
+
+    roots = {find(t) for t in target_nodes}
+    return {mapping[u] for u in graph if find(u) in roots}
+
+
+def _target_points_by_witness(graph: Dict[str, Dict[str, int]],
+                              table: Dict[int, Dict[int, int]],
+                              weighted: bool,
+                              target_nodes: List[str]) -> Optional[Set[int]]:
+    """
+    Номера пунктов для искомых вершин без полного перебора: каждая пара
+    (искомая вершина t, кандидат v) доказывается одним сопоставлением с t -> v
+    или опровергается неудачным поиском. Каждое найденное сопоставление
+    подтверждает сразу все пары (t, его образ t), и такие пары больше
+    не проверяются — работа ограничена |искомые|·|кандидаты| поисками.
+    None — если сопоставления нет вовсе.
+    """
+    domains = _candidate_domains(graph, table, weighted)
+    if domains is None:
+        return None
+    table_bits = _BitAdjacency(table)
+
+    witnessed: Set[Tuple[str, int]] = set()
+    for t in target_nodes:
+        for v in sorted(domains[t]):
+            if (t, v) in witnessed:
+                continue
+            mapping = next(_search_isomorphisms(graph, table_bits, weighted, domains, fixed=(t, v)), None)
+            if mapping is not None:
+                witnessed.update((t2, mapping[t2]) for t2 in target_nodes)
+
+    if not witnessed:
+        # Опровергнуты все кандидаты, значит, сопоставления нет
+        return None
+    return {v for _, v in witnessed}